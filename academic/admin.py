@@ -1,13 +1,58 @@
 from django.contrib import admin
-from .models import (Award, Profile, Proposal, Reference, Course, DeliveredProduct,
+from django.contrib.admin.views.main import ChangeList
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import (Award, Download, Profile, Proposal, Reference, Course, DeliveredProduct,
                      Experience, Innovation, Talk, Grant, Education, Service, Quote,
                      Figure, Student, ReferencePerson, Milestone, Review, TechReport)
 
-class ReferenceAdmin(admin.ModelAdmin):
+def update_action(name, description, **values):
+    """An admin action that sets ``values`` on every selected row in one UPDATE.
+
+    A batch edit after a conference decision costs one query however many rows
+    it touches; QuerySet.update sends no per-row save signals, which nothing
+    here needs (see ``cv_redirect``).
+    """
+    def action(modeladmin, request, queryset):
+        changes = dict(values)
+        # update() bypasses auto_now, so stamp the rows by hand.
+        if any(field.name == 'updated_at' for field in queryset.model._meta.concrete_fields):
+            changes['updated_at'] = timezone.now()
+        count = queryset.update(**changes)
+        opts = queryset.model._meta
+        modeladmin.message_user(request, "Updated %d %s." % (
+            count, opts.verbose_name if count == 1 else opts.verbose_name_plural))
+
+    action.__name__ = name
+    return admin.action(description=description)(action)
+
+
+class OwnedAdmin(admin.ModelAdmin):
+    """For models with an owning site: adds it to the end of the form.
+
+    Left blank, a row belongs to the default site, which is all a single-site
+    database ever needs.
+    """
+
+    def get_fieldsets(self, request, obj=None):
+        return [*super().get_fieldsets(request, obj),
+                ('Site', {'fields': ['owner'], 'classes': ['collapse']})]
+
+
+class ReferenceAdmin(OwnedAdmin):
     list_display = ['get_short_title', 'year', 'medium', 'status', 'refereed']
     list_filter = ['medium', 'status', 'refereed', 'year']
-    search_fields = ['title', 'authors']
+    # Also what the autocomplete widgets on the other change forms search.
+    search_fields = ['title', 'authors', 'journal', 'doi', 'arxiv_id']
     ordering = ['-year', 'title']
+    actions = [
+        update_action('mark_in_review', "Mark selected references as in review", status='in_review'),
+        update_action('mark_accepted', "Mark selected references as accepted", status='accepted'),
+        update_action('mark_published', "Mark selected references as published", status='published'),
+        update_action('mark_rejected', "Mark selected references as rejected", status='rejected'),
+        update_action('mark_refereed', "Mark selected references as refereed", refereed=True),
+    ]
 
     prepopulated_fields = {'slug': ('title',), 'cv_ref_slug': ('title',)}
 
@@ -27,7 +72,7 @@ class ReferenceAdmin(admin.ModelAdmin):
         })
     ]
 
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(OwnedAdmin):
     list_display = ['title', 'course_format', 'course_code', 'institution', 'semester', 'year', 'role']
     list_filter = ['course_format', 'semester', 'year', 'role', 'is_graduate', 'is_online']
     search_fields = ['course_code', 'title', 'institution']
@@ -45,7 +90,7 @@ class CourseAdmin(admin.ModelAdmin):
         })
     ]
 
-class ExperienceAdmin(admin.ModelAdmin):
+class ExperienceAdmin(OwnedAdmin):
     list_display = ['title', 'institution', 'job_type', 'academic_position_type', 'start_date', 'is_current']
     list_filter = ['job_type', 'academic_position_type', 'full_time', 'tenure_track', 'is_current']
     search_fields = ['title', 'institution', 'department']
@@ -64,11 +109,17 @@ class ExperienceAdmin(admin.ModelAdmin):
         })
     ]
 
-class TalkAdmin(admin.ModelAdmin):
+class TalkAdmin(OwnedAdmin):
     list_display = ['get_short_title', 'talk_type', 'invited', 'proceedings', 'date']
     list_filter = ['talk_type', 'invited', 'proceedings', 'date']
     search_fields = ['title', 'venue', 'location']
     ordering = ['-date', 'title']
+    autocomplete_fields = ['reference', 'related_publications']
+    actions = [
+        update_action('mark_invited', "Mark selected talks as invited", invited=True),
+        update_action('mark_not_invited', "Mark selected talks as not invited", invited=False),
+        update_action('mark_proceedings', "Mark selected talks as in proceedings", proceedings=True),
+    ]
 
     prepopulated_fields = {'slug': ('title',), 'cv_ref_slug': ('title',)}
 
@@ -101,12 +152,35 @@ class TechReportInline(admin.StackedInline):
               'authorship_percent', 'description', 'report', 'slides', 'cv_ref_slug', 'order']
     prepopulated_fields = {'slug': ('title',), 'cv_ref_slug': ('title',)}
 
-class GrantAdmin(admin.ModelAdmin):
-    list_display = ['title', 'funding_agency', 'role', 'get_formatted_amount']
+def _per_grant_count(model):
+    """How many ``model`` rows each grant has, as a correlated subquery.
+
+    Not a join and COUNT, so that counting the changelist's grants, which
+    drops unused annotations and the ordering, stays a plain COUNT(*).
+    """
+    return Coalesce(Subquery(
+        model.objects.filter(grant=OuterRef('pk')).order_by().values('grant')
+        .annotate(count=Count('pk')).values('count')), 0)
+
+class GrantChangeList(ChangeList):
+    """Counts each grant's reports and milestones in the query for the page itself,
+    rather than one query per row. Only here: the autocomplete pickers and the
+    change form never show the counts, so they go without."""
+
+    def get_queryset(self, request, exclude_parameters=None):
+        return super().get_queryset(request, exclude_parameters).annotate(
+            report_count=_per_grant_count(TechReport),
+            milestone_count=_per_grant_count(Milestone),
+        )
+
+class GrantAdmin(OwnedAdmin):
+    list_display = ['title', 'funding_agency', 'role', 'get_formatted_amount',
+                    'report_count', 'milestone_count']
     list_filter = ['role']
     inlines = [TechReportInline, MilestoneInline]
-    search_fields = ['title', 'funding_agency', 'co_pis']
+    search_fields = ['title', 'short_title', 'funding_agency', 'co_pis', 'grant_number']
     ordering = ['title']
+    autocomplete_fields = ['related_publications']
 
     fieldsets = [
         ('Basic Information', {
@@ -128,10 +202,23 @@ class GrantAdmin(admin.ModelAdmin):
         })
     ]
 
-class EducationAdmin(admin.ModelAdmin):
+    def get_changelist(self, request, **kwargs):
+        return GrantChangeList
+
+    # Sorted by the expressions, as root_queryset carries no annotations.
+    @admin.display(description='Reports', ordering=_per_grant_count(TechReport))
+    def report_count(self, obj):
+        return obj.report_count
+
+    @admin.display(description='Milestones', ordering=_per_grant_count(Milestone))
+    def milestone_count(self, obj):
+        return obj.milestone_count
+
+class EducationAdmin(OwnedAdmin):
     list_display = ['degree_type', 'field_of_study', 'institution', 'graduation_year', 'gpa']
     search_fields = ['field_of_study', 'institution', 'location']
     ordering = ['-graduation_year', 'degree_type']
+    autocomplete_fields = ['related_publications']
 
     fieldsets = [
         ('Basic Information', {
@@ -146,7 +233,7 @@ class EducationAdmin(admin.ModelAdmin):
         })
     ]
 
-class ServiceAdmin(admin.ModelAdmin):
+class ServiceAdmin(OwnedAdmin):
     list_display = ['role', 'organization', 'service_type', 'category', 'year']
     list_filter = ['role', 'service_type', 'category', 'year']
     search_fields = ['organization', 'location']
@@ -162,12 +249,12 @@ class ServiceAdmin(admin.ModelAdmin):
     ]
 
 class ProfileAdmin(admin.ModelAdmin):
-    list_display = ['name', 'title', 'institution', 'email']
+    list_display = ['name', 'domain', 'title', 'institution', 'email']
     search_fields = ['name', 'title', 'institution']
 
     fieldsets = [
         ('Basic Information', {
-            'fields': ['name', 'occupation', 'title','long_title','headshot', 'bio', 'short_bio', 'under_construction', 'show_publications']
+            'fields': ['name', 'domain', 'occupation', 'title','long_title','headshot', 'bio', 'short_bio', 'under_construction', 'show_publications']
         }),
         ('Contact Information', {
             'fields': ['email', 'room_number', 'building', 'street', 'city', 'state', 'zip_code', 'country', 'website','phone'],
@@ -188,7 +275,7 @@ class ProfileAdmin(admin.ModelAdmin):
         })
     ]
 
-class QuoteAdmin(admin.ModelAdmin):
+class QuoteAdmin(OwnedAdmin):
     list_display = ['author']
     fieldsets = [
         ('Basic Information', {
@@ -196,7 +283,7 @@ class QuoteAdmin(admin.ModelAdmin):
         })
     ]
 
-class FigureAdmin(admin.ModelAdmin):
+class FigureAdmin(OwnedAdmin):
     list_display = ['name']
     fieldsets = [
         (None, {
@@ -204,11 +291,12 @@ class FigureAdmin(admin.ModelAdmin):
         })
     ]
 
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(OwnedAdmin):
     list_display = ['name', 'level', 'degree', 'mentorship_role', 'institution', 'start_date', 'end_date'] # Added degree, mentorship_role
     list_filter = ['level', 'mentorship_role', 'institution', 'start_date'] # Added mentorship_role
     search_fields = ['name', 'institution', 'project_title', 'degree'] # Added degree
     ordering = ['-start_date', 'name']
+    autocomplete_fields = ['resulting_publications']
     fieldsets = [
         ('Basic Information', {
             'fields': ['name', 'level', 'degree', 'institution'] # Added degree
@@ -223,7 +311,7 @@ class StudentAdmin(admin.ModelAdmin):
         })
     ]
 
-class ReferencePersonAdmin(admin.ModelAdmin):
+class ReferencePersonAdmin(OwnedAdmin):
     list_display = ['name', 'title', 'institution', 'email']
     search_fields = ['name', 'title', 'institution', 'relationship']
     ordering = ['name']
@@ -237,7 +325,7 @@ class ReferencePersonAdmin(admin.ModelAdmin):
         })
     ]
 
-class AwardAdmin(admin.ModelAdmin):
+class AwardAdmin(OwnedAdmin):
     """Section I.D of the CV."""
     list_display = ['title', 'organization', 'year', 'order']
     search_fields = ['title', 'organization']
@@ -252,7 +340,7 @@ class AwardAdmin(admin.ModelAdmin):
         })
     ]
 
-class DeliveredProductAdmin(admin.ModelAdmin):
+class DeliveredProductAdmin(OwnedAdmin):
     """Section I.C of the CV."""
     list_display = ['name', 'sponsor', 'order']
     search_fields = ['name', 'summary', 'sponsor']
@@ -270,12 +358,13 @@ class DeliveredProductAdmin(admin.ModelAdmin):
         })
     ]
 
-class InnovationAdmin(admin.ModelAdmin):
+class InnovationAdmin(OwnedAdmin):
     """Section II.B of the CV."""
     list_display = ['title', 'sponsors_projects_dates', 'order']
     search_fields = ['title', 'sponsors_projects_dates']
     ordering = ['order', 'title']
     prepopulated_fields = {'cv_ref_slug': ('title',)}
+    autocomplete_fields = ['grants']
     fieldsets = [
         ('Basic Information', {
             'fields': ['title', 'grants', 'sponsors_projects_dates']
@@ -288,13 +377,14 @@ class InnovationAdmin(admin.ModelAdmin):
         })
     ]
 
-class ProposalAdmin(admin.ModelAdmin):
+class ProposalAdmin(OwnedAdmin):
     """Section IV.B of the CV."""
     list_display = ['title', 'sponsor', 'result', 'amount_requested', 'date_abstract_submitted']
     list_filter = ['result', 'sponsor']
     search_fields = ['title', 'sponsor', 'solicitation']
     ordering = ['order', '-date_abstract_submitted', 'title']
     prepopulated_fields = {'slug': ('title',), 'cv_ref_slug': ('short_title',)}
+    autocomplete_fields = ['grant']
     fieldsets = [
         ('Basic Information', {
             'fields': ['title', 'short_title', 'slug', 'sponsor', 'solicitation',
@@ -314,9 +404,11 @@ class TechReportAdmin(admin.ModelAdmin):
     """Section II.A of the CV."""
     list_display = ['title', 'grant', 'report_type', 'date', 'authorship_percent']
     list_filter = ['report_type', 'grant']
+    list_select_related = ['grant']
     search_fields = ['title', 'description']
     ordering = ['order', '-date', 'title']
     prepopulated_fields = {'slug': ('title',), 'cv_ref_slug': ('title',)}
+    autocomplete_fields = ['grant']
     fieldsets = [
         ('Basic Information', {
             'fields': ['grant', 'title', 'slug', 'report_type', 'date']
@@ -329,12 +421,19 @@ class TechReportAdmin(admin.ModelAdmin):
         })
     ]
 
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(OwnedAdmin):
     """Sections V.A and V.B: peer review and editorial work."""
     list_display = ['venue', 'kind', 'year', 'manuscript_count']
     list_filter = ['kind', 'year']
     search_fields = ['venue', 'role']
     ordering = ['-year', 'venue']
+    actions = [
+        update_action('mark_journal_review', "Mark selected as journal peer review",
+                      kind='journal_review'),
+        update_action('mark_conference_review', "Mark selected as conference peer review",
+                      kind='conference_review'),
+        'extend_to_this_year',
+    ]
     fieldsets = [
         ('Basic Information', {
             'fields': ['venue', 'kind', 'role', 'year', 'end_year', 'manuscript_count']
@@ -344,6 +443,11 @@ class ReviewAdmin(admin.ModelAdmin):
         })
     ]
 
+    @admin.action(description="Extend selected appointments to this year")
+    def extend_to_this_year(self, request, queryset):
+        count = queryset.update(end_year=timezone.localdate().year, updated_at=timezone.now())
+        self.message_user(request, "Extended %d appointment%s." % (count, "" if count == 1 else "s"))
+
 admin.site.register(Review, ReviewAdmin)
 admin.site.register(Proposal, ProposalAdmin)
 admin.site.register(TechReport, TechReportAdmin)
@@ -366,7 +470,38 @@ admin.site.register(ReferencePerson, ReferencePersonAdmin)
 class MilestoneAdmin(admin.ModelAdmin):
     list_display = ('title', 'grant', 'date')
     list_filter = ('grant', 'date')
+    list_select_related = ('grant',)
     search_fields = ('title', 'description')
     prepopulated_fields = {'slug': ('title',)}
-
-admin.site.register(Milestone, MilestoneAdmin)
\ No newline at end of file
+    autocomplete_fields = ('grant',)
+
+admin.site.register(Milestone, MilestoneAdmin)
+
+class DownloadAdmin(admin.ModelAdmin):
+    """Downloads per file per day, read-only, with each file's total over the
+    selected days and filters above the daily rows."""
+    list_display = ('day', 'kind', 'slug', 'count')
+    # Today, the past 7 days, this month or this year; unlike date_hierarchy,
+    # without a query for the dates there are.
+    list_filter = ('kind', 'day')
+    search_fields = ('slug',)
+
+    # Files listed in the totals, most downloaded first.
+    TOP = 25
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        if not hasattr(response, 'context_data') or 'cl' not in response.context_data:
+            return response  # a redirect or an error page
+        response.context_data['totals'] = (
+            response.context_data['cl'].queryset.order_by().values('kind', 'slug')
+            .annotate(total=Sum('count')).order_by('-total', 'kind', 'slug')[:self.TOP])
+        return response
+
+admin.site.register(Download, DownloadAdmin)
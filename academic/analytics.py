@@ -0,0 +1,149 @@
+"""Count downloads of papers, slides, posters and the CV without a write per hit.
+
+The redirects call ``record``, which adds one to a counter in this process's
+memory and touches no database. A thread writes the counters to ``Download``,
+one row per file per day, every ``ANALYTICS_FLUSH_INTERVAL`` seconds (60 by
+default) or as soon as ``ANALYTICS_FLUSH_THRESHOLD`` hits (500) are waiting,
+and once more when the process exits. A worker that is killed outright loses
+at most the hits since its last flush.
+
+The thread only runs in processes that serve the site, which call ``start()``
+from ``hansriess.asgi`` and ``hansriess.wsgi``. Anywhere else, the test suite
+included, hits stay in memory until ``flush()`` is called.
+"""
+
+import atexit
+import logging
+import threading
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from academic.models import Download
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 60
+DEFAULT_THRESHOLD = 500
+
+# Rows per INSERT and UPDATE; keeps the UPDATE's CASE within SQLite's limits.
+BATCH_SIZE = 200
+
+_lock = threading.Lock()
+_pending = {}  # (kind, slug, day) -> hits not yet written
+_waiting = 0  # sum of _pending's values
+_wake = threading.Event()
+_flusher = None
+_started = False
+
+
+def interval():
+    return getattr(settings, 'ANALYTICS_FLUSH_INTERVAL', DEFAULT_INTERVAL)
+
+
+def threshold():
+    return getattr(settings, 'ANALYTICS_FLUSH_THRESHOLD', DEFAULT_THRESHOLD)
+
+
+def record(kind, slug):
+    """Count one hit on ``kind`` ('paper', 'slides', 'poster' or 'cv') ``slug``."""
+    global _waiting
+    key = (kind, str(slug), timezone.localdate())
+    with _lock:
+        _pending[key] = _pending.get(key, 0) + 1
+        _waiting += 1
+        full = _waiting >= threshold()
+    if _started:
+        _ensure_flusher()
+        if full:
+            _wake.set()
+
+
+def pending():
+    """The hits waiting to be written, by (kind, slug, day)."""
+    with _lock:
+        return dict(_pending)
+
+
+def reset():
+    """Forget every hit not yet written."""
+    global _pending, _waiting
+    with _lock:
+        _pending, _waiting = {}, 0
+
+
+def flush():
+    """Write every waiting hit to the database; returns how many were written.
+
+    Hits that cannot be written go back in the queue for the next flush.
+    """
+    global _pending, _waiting
+    with _lock:
+        counts, _pending, _waiting = _pending, {}, 0
+    if not counts:
+        return 0
+    try:
+        _write(counts)
+    except DatabaseError:
+        with _lock:
+            for key, hits in counts.items():
+                _pending[key] = _pending.get(key, 0) + hits
+            _waiting += sum(counts.values())
+        logger.warning("Could not write download counts; keeping them for the next flush",
+                       exc_info=True)
+        return 0
+    return sum(counts.values())
+
+
+def _write(counts):
+    """Add ``counts`` onto their rows: one INSERT of any rows missing, one UPDATE of all.
+
+    The INSERT ignores rows that exist already, and the UPDATE adds in the
+    database rather than setting a total read beforehand, so two workers
+    flushing the same file at once both count.
+    """
+    items = list(counts.items())
+    with transaction.atomic():
+        for start in range(0, len(items), BATCH_SIZE):
+            batch = items[start:start + BATCH_SIZE]
+            Download.objects.bulk_create(
+                [Download(kind=kind, slug=slug, day=day) for (kind, slug, day), _ in batch],
+                ignore_conflicts=True)
+            Download.objects.filter(
+                reduce(or_, [Q(kind=kind, slug=slug, day=day) for (kind, slug, day), _ in batch])
+            ).update(count=F('count') + Case(
+                *[When(kind=kind, slug=slug, day=day, then=hits)
+                  for (kind, slug, day), hits in batch],
+                default=0))
+
+
+def start():
+    """Flush in the background from now on, and at exit. For server processes."""
+    global _started
+    if not _started:
+        _started = True
+        atexit.register(flush)
+
+
+def _ensure_flusher():
+    global _flusher
+    # Started on the first hit rather than by start(), because a server that
+    # imports the site before forking its workers would leave the thread behind
+    # in the parent; is_alive() is False in a forked child.
+    if _flusher is None or not _flusher.is_alive():
+        with _lock:
+            if _flusher is None or not _flusher.is_alive():
+                _flusher = threading.Thread(target=_run, name='analytics', daemon=True)
+                _flusher.start()
+
+
+def _run():
+    while True:
+        _wake.wait(interval())
+        _wake.clear()
+        flush()
+        close_old_connections()
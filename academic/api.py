@@ -0,0 +1,211 @@
+"""Read-only JSON for publications, talks and grants.
+
+    /api/publications/?medium=journal_article&year=2024&fields=title,year
+    /api/talks/?talk_type=tutorial&limit=50
+    /api/grants/?cursor=<next from the previous page>
+
+Pages follow each model's own ordering with the primary key as a tie-break,
+and are paginated by keyset rather than by offset: ``next`` carries the sort
+key of the last row, and the following page is whatever sorts after it. Page
+fifty costs what page one does, and a row added meanwhile does not shift the
+rest of the list by one.
+
+Each site lists only its own rows. Responses carry an ``ETag`` and a short
+public ``max-age``, so a client that revalidates gets a ``304`` when nothing
+changed.
+"""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, set_response_etag
+from django.views.decorators.http import require_safe
+
+from academic.models import Grant, Reference, Talk
+from academic.routers import reads_from_replica
+
+# How long a shared cache may serve a page before revalidating it.
+API_MAX_AGE = 300
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+@dataclass
+class Resource:
+    """What one endpoint exposes of a model."""
+    model: type
+    # Public fields, in output order. Anything else (passwords, CV narratives,
+    # file paths) is never selected.
+    fields: tuple
+    # (field, descending) pairs: the model's Meta.ordering, then the pk.
+    ordering: tuple
+    # Query parameter -> ORM lookup. Years must be integers.
+    filters: dict = field(default_factory=dict)
+
+
+PUBLICATIONS = Resource(
+    model=Reference,
+    fields=('slug', 'title', 'authors', 'year', 'publication_date', 'medium', 'status',
+            'refereed', 'journal', 'volume', 'issue', 'pages', 'doi', 'arxiv_id', 'url',
+            'code', 'keywords', 'abstract'),
+    ordering=(('year', True), ('title', False), ('pk', False)),
+    filters={'medium': 'medium', 'status': 'status', 'year': 'year'},
+)
+
+TALKS = Resource(
+    model=Talk,
+    fields=('slug', 'title', 'venue', 'location', 'talk_type', 'invited', 'date',
+            'event_url', 'abstract'),
+    ordering=(('date', True), ('title', False), ('pk', False)),
+    filters={'talk_type': 'talk_type', 'year': 'date__year'},
+)
+
+GRANTS = Resource(
+    model=Grant,
+    fields=('slug', 'title', 'short_title', 'funding_agency', 'role', 'start_date',
+            'end_date'),
+    ordering=(('start_date', True), ('title', False), ('pk', False)),
+    filters={'role': 'role', 'year': 'start_date__year'},
+)
+
+
+class BadRequest(ValueError):
+    """A query parameter that cannot be honoured; reported as a 400."""
+
+
+def _endpoint(resource):
+    @require_safe
+    @reads_from_replica
+    def view(request):
+        try:
+            body = page(resource, request)
+        except BadRequest as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        response = JsonResponse(body, encoder=DjangoJSONEncoder)
+        patch_cache_control(response, public=True, max_age=API_MAX_AGE)
+        set_response_etag(response)
+        return get_conditional_response(request, etag=response['ETag'], response=response)
+    return view
+
+
+publications = _endpoint(PUBLICATIONS)
+talks = _endpoint(TALKS)
+grants = _endpoint(GRANTS)
+
+
+def page(resource, request):
+    """The ``{"results": [...], "next": url}`` body for one request."""
+    params = request.GET
+    fields = _fields(resource, params.get('fields'))
+    limit = _limit(params.get('limit'))
+
+    keys = [name for name, _ in resource.ordering]
+    queryset = (resource.model.objects.owned_by(request.profile)
+                .filter(_filters(resource, params))
+                .order_by(*[_order(name, descending) for name, descending in resource.ordering])
+                .only(*{*fields, *keys} - {'pk'}))
+    if params.get('cursor'):
+        try:
+            queryset = queryset.filter(after(resource.ordering,
+                                             decode_cursor(params['cursor'], len(keys))))
+        except (TypeError, ValueError, ValidationError):
+            raise BadRequest("Invalid cursor.")
+
+    # One row beyond the page says whether there is a next one.
+    rows = list(queryset[:limit + 1])
+    results = [{name: getattr(row, name) for name in fields} for row in rows[:limit]]
+
+    next_url = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        query = params.copy()
+        query['cursor'] = encode_cursor([getattr(last, name) for name in keys])
+        next_url = request.build_absolute_uri('?' + query.urlencode())
+    return {'results': results, 'next': next_url}
+
+
+def after(ordering, values):
+    """Rows that sort strictly after ``values`` in ``ordering``.
+
+    For keys (a, b, c) that is a > x, or a = x and b > y, or a = x and b = y
+    and c > z, with "greater" read per direction. NULLs sort first in a
+    descending key and last in an ascending one, as ``_order`` asks for.
+    """
+    clauses, equal = [], Q()
+    for (name, descending), value in zip(ordering, values):
+        clauses.append(equal & _beyond(name, descending, value))
+        equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+    return reduce(or_, clauses)
+
+
+def _beyond(name, descending, value):
+    if descending:
+        return Q(**{f'{name}__isnull': False}) if value is None else Q(**{f'{name}__lt': value})
+    if value is None:
+        return Q(pk__in=[])
+    return Q(**{f'{name}__gt': value}) | Q(**{f'{name}__isnull': True})
+
+
+def _order(name, descending):
+    return F(name).desc(nulls_first=True) if descending else F(name).asc(nulls_last=True)
+
+
+def encode_cursor(values):
+    text = json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise BadRequest("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != length:
+        raise BadRequest("Invalid cursor.")
+    return values
+
+
+def _fields(resource, requested):
+    if not requested:
+        return resource.fields
+    fields = tuple(name.strip() for name in requested.split(',') if name.strip())
+    unknown = [name for name in fields if name not in resource.fields]
+    if unknown or not fields:
+        raise BadRequest("Unknown field(s): %s. Choose from %s."
+                         % (", ".join(unknown) or "none given", ", ".join(resource.fields)))
+    return fields
+
+
+def _limit(requested):
+    if not requested:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(requested)
+    except ValueError:
+        raise BadRequest("limit must be an integer.")
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def _filters(resource, params):
+    """``?medium=book&medium=thesis`` is either; different parameters all apply."""
+    condition = Q()
+    for param, lookup in resource.filters.items():
+        values = params.getlist(param)
+        if not values:
+            continue
+        if param == 'year':
+            try:
+                values = [int(value) for value in values]
+            except ValueError:
+                raise BadRequest("year must be an integer.")
+        condition &= Q(**{f'{lookup}__in': values})
+    return condition
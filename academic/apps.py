@@ -7,4 +7,8 @@ class AcademicConfig(AppConfig):
     Configuration for the 'academic' app.
     """
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'academic'
\ No newline at end of file
+    name = 'academic'
+
+    def ready(self):
+        from . import signals
+        signals.connect()
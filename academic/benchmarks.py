@@ -0,0 +1,255 @@
+"""Synthetic data at scale, and timings of the pages and CV built from it.
+
+``cv_sample`` has a handful of rows of each kind, which says nothing about how
+the landing page or the CV behave with a career's worth of publications and
+talks. ``seed`` writes ``size`` references and talks, with grants (each with
+reports and milestones), students, reviews and service in proportion, all
+from a seeded generator so that two runs produce the same rows. ``measure``
+times one scenario and counts its queries and peak memory.
+
+Everything ``seed`` writes has a slug or title starting with ``bench-``, and
+``clear`` deletes exactly those rows.
+"""
+
+import datetime
+import random
+import statistics
+import time
+import tracemalloc
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from academic import cv_builder, tenants, views
+from academic.models import (Grant, Milestone, Profile, Reference, Review, Service, Student,
+                             Talk, TechReport)
+
+PREFIX = 'bench-'
+
+WORDS = ('sheaf', 'lattice', 'quantale', 'laplacian', 'consensus', 'topology', 'network',
+         'diffusion', 'cohomology', 'category', 'signal', 'graph', 'multi-agent', 'learning',
+         'optimal', 'control', 'persistent', 'homology', 'distributed', 'spectral')
+SURNAMES = ('Riess', 'Ghrist', 'Hansen', 'Robinson', 'Curry', 'Pappas', 'Kapoor', 'Ames',
+            'Nguyen', 'Okafor', 'Schmidt', 'Tanaka', 'Rossi', 'Silva', 'Moreau', 'Kowalski')
+VENUES = ('SIAM J. Appl. Algebra Geom.', 'IEEE Trans. Signal Process.', 'Proc. IEEE CDC',
+          'Proc. ACC', 'J. Appl. Comput. Topol.', 'Compositionality', 'arXiv')
+
+BATCH_SIZE = 1000
+
+
+def clear():
+    """Delete every row ``seed`` wrote."""
+    Grant.objects.filter(slug__startswith=PREFIX).delete()  # with reports and milestones
+    Reference.objects.filter(slug__startswith=PREFIX).delete()
+    Talk.objects.filter(slug__startswith=PREFIX).delete()
+    Student.objects.filter(name__startswith=PREFIX).delete()
+    Review.objects.filter(venue__startswith=PREFIX).delete()
+    Service.objects.filter(title__startswith=PREFIX).delete()
+
+
+def seed(size, seed=0):
+    """Write ``size`` references and talks, and the rest in proportion.
+
+    Returns the number of rows written per model. The profile is left alone if
+    there is one, and otherwise created to serve an uploaded CV, so that /cv/
+    can be timed without LaTeX.
+    """
+    rng = random.Random(seed)
+    if not Profile.objects.exists():
+        Profile.objects.create(name="Hans Riess", show_publications=True, use_custom_cv=True,
+                               custom_cv='cv/benchmark.pdf')
+
+    references = Reference.objects.bulk_create(
+        [_reference(rng, n) for n in range(size)], batch_size=BATCH_SIZE)
+    talks = Talk.objects.bulk_create(
+        [_talk(rng, n) for n in range(size)], batch_size=BATCH_SIZE)
+    grants = Grant.objects.bulk_create(
+        [_grant(rng, n) for n in range(max(1, size // 20))], batch_size=BATCH_SIZE)
+    reports = TechReport.objects.bulk_create(
+        [_report(rng, grant, n) for grant in grants for n in range(5)], batch_size=BATCH_SIZE)
+    milestones = Milestone.objects.bulk_create(
+        [_milestone(rng, grant, n) for grant in grants for n in range(5)], batch_size=BATCH_SIZE)
+    Grant.related_publications.through.objects.bulk_create(
+        [Grant.related_publications.through(grant_id=grant.pk, reference_id=reference.pk)
+         for grant in grants for reference in rng.sample(references, min(10, len(references)))],
+        batch_size=BATCH_SIZE)
+    students = Student.objects.bulk_create(
+        [_student(rng, n) for n in range(max(1, size // 10))], batch_size=BATCH_SIZE)
+    reviews = Review.objects.bulk_create(
+        [_review(rng, n) for n in range(max(1, size // 10))], batch_size=BATCH_SIZE)
+    services = Service.objects.bulk_create(
+        [_service(rng, n) for n in range(max(1, size // 10))], batch_size=BATCH_SIZE)
+    return {
+        'references': len(references), 'talks': len(talks), 'grants': len(grants),
+        'tech_reports': len(reports), 'milestones': len(milestones),
+        'students': len(students), 'reviews': len(reviews), 'services': len(services),
+    }
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _prose(rng, sentences):
+    return ". ".join(_sentence(rng, rng.randint(8, 20)) for _ in range(sentences)) + "."
+
+
+def _authors(rng):
+    names = ["%s. %s" % (chr(65 + rng.randrange(26)), rng.choice(SURNAMES))
+             for _ in range(rng.randint(1, 5))]
+    names.insert(rng.randrange(len(names) + 1), "H. Riess")
+    return ", ".join(names)
+
+
+def _date(rng):
+    return datetime.date(rng.randint(2012, 2026), rng.randint(1, 12), rng.randint(1, 28))
+
+
+def _reference(rng, n):
+    medium = rng.choice(Reference.MEDIUM_CHOICES)[0]
+    return Reference(
+        title=_sentence(rng, rng.randint(4, 12)), authors=_authors(rng),
+        year=rng.randint(2012, 2026), medium=medium,
+        status=rng.choice(('published', 'published', 'accepted', 'in_review')),
+        refereed=medium in ('journal_article', 'conference_proceedings'),
+        journal=rng.choice(VENUES), volume=str(rng.randint(1, 80)),
+        issue=str(rng.randint(1, 12)), pages="%d–%d" % (n, n + rng.randint(5, 30)),
+        url=f'https://example.org/papers/{n}', slug=f'{PREFIX}paper-{n}',
+        abstract=_prose(rng, rng.randint(5, 12)), keywords=", ".join(rng.sample(WORDS, 4)),
+    )
+
+
+def _talk(rng, n):
+    return Talk(
+        title=_sentence(rng, rng.randint(3, 9)), venue=rng.choice(VENUES),
+        talk_type=rng.choice(Talk.TALK_TYPE_CHOICES)[0], invited=rng.random() < 0.3,
+        date=_date(rng), slug=f'{PREFIX}talk-{n}', slides=f'talks/slides/{PREFIX}{n}.pdf',
+        abstract=_prose(rng, rng.randint(3, 8)),
+    )
+
+
+def _grant(rng, n):
+    return Grant(
+        title=f'{PREFIX}grant {n}: {_sentence(rng, 5)}', short_title=f'Grant {n}',
+        slug=f'{PREFIX}grant-{n}', funding_agency=rng.choice(('NSF', 'DARPA', 'ONR', 'AFOSR')),
+        role=rng.choice(Grant.ROLE_CHOICES)[0], amount=rng.randint(50, 3000) * 1000,
+        start_date=_date(rng), description=_prose(rng, 20), contributions=_prose(rng, 10),
+        report_series_note=_prose(rng, 3),
+    )
+
+
+def _report(rng, grant, n):
+    return TechReport(grant=grant, title=_sentence(rng, 6), date=_date(rng),
+                      page_count=rng.randint(5, 60), description=_prose(rng, 4), order=n)
+
+
+def _milestone(rng, grant, n):
+    return Milestone(grant=grant, title=_sentence(rng, 5), date=_date(rng),
+                     description=_prose(rng, 4))
+
+
+def _student(rng, n):
+    return Student(name=f'{PREFIX}student {n}', level=rng.choice(Student.LEVEL_CHOICES)[0],
+                   institution="Georgia Tech", project_title=_sentence(rng, 6),
+                   start_date=_date(rng))
+
+
+def _review(rng, n):
+    return Review(venue=f'{PREFIX}{rng.choice(VENUES)}', kind=rng.choice(Review.KIND_CHOICES)[0],
+                  year=rng.randint(2015, 2026), manuscript_count=rng.randint(1, 6))
+
+
+def _service(rng, n):
+    return Service(title=f'{PREFIX}{_sentence(rng, 4)}', organization=rng.choice(VENUES),
+                   role=rng.choice(Service.ROLE_CHOICES)[0], year=rng.randint(2015, 2026))
+
+
+# --- Scenarios ---------------------------------------------------------------
+
+def _get(view, path, **kwargs):
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+
+    def run():
+        request = RequestFactory().get(path)
+        request.session = SessionBase()
+        tenants.attach(request)
+        return view(request, **kwargs)
+    return run
+
+
+def scenarios():
+    """Name -> callable for everything ``benchmark`` times, against the current data."""
+    profile = Profile.current()
+    grant = Grant.objects.filter(slug__startswith=PREFIX).order_by('pk').first()
+    reference = Reference.objects.filter(slug__startswith=PREFIX).order_by('pk').first()
+    talk = Talk.objects.filter(slug__startswith=PREFIX).order_by('pk').first()
+    return {
+        'build_document': lambda: cv_builder.build_document(profile),
+        'index': _get(views.index, '/'),
+        'project_view': _get(views.project_view, f'/project/{grant.slug}/',
+                             project_slug=grant.slug),
+        'cv_redirect': _get(views.cv_redirect, '/cv/'),
+        'paper_redirect': _get(views.paper_redirect, f'/paper/{reference.slug}/',
+                               paper_slug=reference.slug),
+        'slide_redirect': _get(views.slide_redirect, f'/talk/{talk.slug}/slides/',
+                               talk_slug=talk.slug),
+    }
+
+
+def measure(run, repeat=5, cold=False):
+    """Median wall time, query count and peak traced memory of ``run``.
+
+    One untimed call first warms imports and template loading. With ``cold``
+    every call starts from an empty cache, as the first request after a deploy
+    or an edit does; otherwise the fragment and profile caches are warm.
+    """
+    run()
+    timings = []
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+            Profile.invalidate_current()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    if cold:
+        cache.clear()
+        Profile.invalidate_current()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'wall_ms': round(statistics.median(timings) * 1000, 2),
+        'queries': len(queries),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of ``results`` against ``baseline``, as readable lines.
+
+    Wall time and memory regress when they grow by more than ``tolerance``
+    (0.2 is 20%); any extra query is a regression.
+    """
+    problems = []
+    for size, timings in results.items():
+        for name, now in timings.items():
+            before = baseline.get(size, {}).get(name)
+            if not before:
+                continue
+            if now['queries'] > before['queries']:
+                problems.append(f"{name} at {size}: {before['queries']} -> {now['queries']} queries")
+            for key in ('wall_ms', 'peak_kib'):
+                if before[key] and now[key] > before[key] * (1 + tolerance):
+                    problems.append(f"{name} at {size}: {key} {before[key]} -> {now[key]}")
+    return problems
@@ -0,0 +1,479 @@
+"""Reads BibTeX and CSL-JSON libraries into unsaved Reference rows.
+
+Everything here is offline and pure: parsing touches neither the network nor
+the database, so the ``import_references`` command can read a whole library,
+match it against what is already stored, and write the result in a handful of
+queries.
+
+The fields map onto Reference the way the admin form is filled in by hand:
+``journal`` holds the venue whatever kind of venue it is (journal, proceedings,
+publisher, school), ``issue`` holds BibTeX's ``number``, and a preprint is work
+in review.
+"""
+
+import datetime
+import json
+import re
+import unicodedata
+
+from .models import Reference
+
+# BibTeX entry types -> Reference.medium. Anything else is 'other'.
+BIBTEX_MEDIUMS = {
+    'article': 'journal_article',
+    'inproceedings': 'conference_proceedings',
+    'conference': 'conference_proceedings',
+    'proceedings': 'conference_proceedings',
+    'book': 'book',
+    'incollection': 'book_chapter',
+    'inbook': 'book_chapter',
+    'phdthesis': 'thesis',
+    'mastersthesis': 'thesis',
+    'thesis': 'thesis',
+    'techreport': 'technical_report',
+    'report': 'technical_report',
+    'unpublished': 'preprint',
+}
+
+# CSL-JSON item types -> Reference.medium.
+CSL_MEDIUMS = {
+    'article-journal': 'journal_article',
+    'paper-conference': 'conference_proceedings',
+    'book': 'book',
+    'chapter': 'book_chapter',
+    'thesis': 'thesis',
+    'report': 'technical_report',
+    'manuscript': 'preprint',
+    'article': 'preprint',
+    'posted-content': 'preprint',
+}
+
+# BibTeX months, by name and by the three-letter macros.
+_MONTHS = {name: index for index, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], 1)}
+
+_MONTHS_AS_STRINGS = {name: str(index) for name, index in _MONTHS.items()}
+
+# New-style (2501.03890) and old-style (math.AT/0601001) identifiers, with the
+# version suffix left outside the group.
+_ARXIV_ID = r'(\d{4}\.\d{4,5}|[a-z\-]+(?:\.[a-z]{2})?/\d{7})(?:v\d+)?'
+_ARXIV_PATTERN = re.compile(r'(?:arxiv\.org/(?:abs|pdf)/|arxiv:\s*)' + _ARXIV_ID, flags=re.IGNORECASE)
+_BARE_ARXIV_PATTERN = re.compile(r'^' + _ARXIV_ID + r'$', flags=re.IGNORECASE)
+
+# TeX accent commands and escapes that turn up in titles and author names.
+_TEX_ACCENTS = {
+    "'": '\u0301', '`': '\u0300', '^': '\u0302', '"': '\u0308',
+    '~': '\u0303', '=': '\u0304', '.': '\u0307', 'c': '\u0327', 'v': '\u030c', 'u': '\u0306',
+}
+_TEX_ACCENT_PATTERN = re.compile(r"""\\([`'^"~=.cvu])\s*\{?\\?(\w)\}?""")
+
+
+# The Reference fields an import fills in, and so the ones an update may touch.
+IMPORTED_FIELDS = ['title', 'authors', 'year', 'publication_date', 'medium', 'journal',
+                   'volume', 'issue', 'pages', 'doi', 'url', 'abstract', 'keywords',
+                   'arxiv_id']
+
+
+class ParseError(ValueError):
+    """The input is not a library this module can read."""
+
+
+# --- Normalisation -----------------------------------------------------------
+
+def normalize_doi(value):
+    """'https://doi.org/10.1109/X' and 'doi:10.1109/x' both become '10.1109/x'."""
+    if not value:
+        return ""
+    value = value.strip().lower()
+    value = re.sub(r'^(https?://(dx\.)?doi\.org/|doi:\s*)', '', value)
+    return value.strip()
+
+
+def normalize_arxiv(value):
+    """'arXiv:2501.03890v2' and '2501.03890' are the same paper."""
+    if not value:
+        return ""
+    value = value.strip().lower()
+    match = _ARXIV_PATTERN.search(value) or _BARE_ARXIV_PATTERN.match(value)
+    return match.group(1) if match else value
+
+
+def normalize_title(value):
+    """Case, punctuation, braces and TeX markup do not make a different paper."""
+    if not value:
+        return ""
+    value = tex_to_text(value).lower()
+    return " ".join(re.findall(r'\w+', value))
+
+
+def tex_to_text(value):
+    """Strip the TeX that BibTeX values carry: braces, accents and escapes."""
+    if not value:
+        return ""
+
+    def _accent(match):
+        return unicodedata.normalize('NFC', match.group(2) + _TEX_ACCENTS[match.group(1)])
+
+    value = _TEX_ACCENT_PATTERN.sub(_accent, value)
+    value = value.replace(r'\&', '&').replace(r'\%', '%').replace(r'\_', '_').replace(r'\$', '$')
+    value = value.replace('---', '—').replace('--', '–')
+    value = re.sub(r'\\(emph|textit|textbf|textrm|mathrm|url)\s*', '', value)
+    value = value.replace('{', '').replace('}', '')
+    return " ".join(value.split())
+
+
+def join_authors(names):
+    """['Hans Riess', 'Robert Ghrist'] -> 'Hans Riess and Robert Ghrist'.
+
+    Three or more get the serial comma, matching how author lists are typed into
+    the admin and how ``cv_builder.format_authors`` splits them again.
+    """
+    names = [name for name in names if name]
+    if len(names) < 3:
+        return " and ".join(names)
+    return "%s, and %s" % (", ".join(names[:-1]), names[-1])
+
+
+# --- BibTeX ------------------------------------------------------------------
+
+def parse_bibtex(text):
+    """Parse BibTeX source into a list of ``(entry_type, fields)`` pairs.
+
+    Handles braced, quoted and bare values, nested braces, ``#`` concatenation
+    and ``@string`` macros; ``@comment`` and ``@preamble`` are skipped. Field
+    names and entry types are lower-cased.
+    """
+    entries = []
+    strings = dict(_MONTHS_AS_STRINGS)
+    pos = 0
+    length = len(text)
+    while True:
+        at = text.find('@', pos)
+        if at < 0:
+            break
+        match = re.compile(r'@\s*(\w+)\s*([{(])').match(text, at)
+        if not match:
+            pos = at + 1
+            continue
+        entry_type = match.group(1).lower()
+        closer = '}' if match.group(2) == '{' else ')'
+        pos = match.end()
+
+        if entry_type in ('comment', 'preamble'):
+            pos = _skip_balanced(text, pos, closer)
+            continue
+
+        if entry_type == 'string':
+            name, value, pos = _read_field(text, pos, strings)
+            strings[name] = value
+            pos = _skip_balanced(text, pos, closer)
+            continue
+
+        # The citation key runs up to the first comma.
+        comma = text.find(',', pos)
+        if comma < 0:
+            raise ParseError("Entry @%s at offset %d has no fields." % (entry_type, at))
+        fields = {'_key': text[pos:comma].strip()}
+        pos = comma + 1
+        while pos < length:
+            pos = _skip_space(text, pos)
+            if pos >= length:
+                break
+            if text[pos] == closer:
+                pos += 1
+                break
+            if text[pos] == ',':
+                pos += 1
+                continue
+            name, value, pos = _read_field(text, pos, strings)
+            if name:
+                fields[name] = value
+        entries.append((entry_type, fields))
+    return entries
+
+
+def _skip_space(text, pos):
+    while pos < len(text) and text[pos].isspace():
+        pos += 1
+    return pos
+
+
+def _skip_balanced(text, pos, closer):
+    depth = 1
+    opener = '{' if closer == '}' else '('
+    while pos < len(text) and depth:
+        if text[pos] == opener:
+            depth += 1
+        elif text[pos] == closer:
+            depth -= 1
+        pos += 1
+    return pos
+
+
+def _read_field(text, pos, strings):
+    """Read ``name = value [# value ...]`` starting at ``pos``."""
+    match = re.compile(r'\s*([\w\-:.]+)\s*=\s*').match(text, pos)
+    if not match:
+        # Not a field; skip to the next separator so one bad line is not fatal.
+        end = min([i for i in (text.find(',', pos), text.find('}', pos)) if i >= 0] or [len(text)])
+        return None, None, max(end, pos + 1)
+    name = match.group(1).lower()
+    pos = match.end()
+    pieces = []
+    while True:
+        pos = _skip_space(text, pos)
+        char = text[pos] if pos < len(text) else ''
+        if char == '{':
+            end = _skip_balanced(text, pos + 1, '}')
+            pieces.append(text[pos + 1:end - 1])
+            pos = end
+        elif char == '"':
+            end = pos + 1
+            depth = 0
+            while end < len(text) and not (text[end] == '"' and depth == 0):
+                depth += {'{': 1, '}': -1}.get(text[end], 0)
+                end += 1
+            pieces.append(text[pos + 1:end])
+            pos = end + 1
+        else:
+            bare = re.compile(r'[^\s,#}){]+').match(text, pos)
+            if not bare:
+                break
+            token = bare.group(0)
+            pieces.append(strings.get(token.lower(), token))
+            pos = bare.end()
+        pos = _skip_space(text, pos)
+        if pos < len(text) and text[pos] == '#':
+            pos += 1
+            continue
+        break
+    return name, "".join(pieces), pos
+
+
+def _bibtex_name(name):
+    """'Riess, Hans' -> 'Hans Riess'; 'Hans Riess' is left alone."""
+    name = tex_to_text(name)
+    parts = [part.strip() for part in name.split(',')]
+    if len(parts) == 2:
+        return "%s %s" % (parts[1], parts[0])
+    if len(parts) == 3:                    # von Last, Jr, First
+        return "%s %s, %s" % (parts[2], parts[0], parts[1])
+    return name
+
+
+def reference_from_bibtex(entry_type, fields):
+    """An unsaved Reference for one BibTeX entry, or None without title and year."""
+    title = tex_to_text(fields.get('title', ''))
+    year = _year(fields.get('year') or fields.get('date', ''))
+    if not title or not year:
+        return None
+
+    medium = BIBTEX_MEDIUMS.get(entry_type, 'other')
+    arxiv_id = _bibtex_arxiv(fields)
+    venue = (fields.get('journal') or fields.get('journaltitle') or fields.get('booktitle')
+             or fields.get('school') or fields.get('institution') or fields.get('publisher') or "")
+    if medium in ('journal_article', 'other') and arxiv_id and (
+            not venue or 'arxiv' in venue.lower()):
+        medium = 'preprint'
+        venue = ""
+
+    authors = [_bibtex_name(name) for name in re.split(r'\s+and\s+', fields.get('author', '')) if name.strip()]
+    return _build(
+        title=title,
+        authors=join_authors(authors),
+        year=year,
+        publication_date=_date(year, fields.get('month'), fields.get('day')),
+        medium=medium,
+        journal=tex_to_text(venue),
+        volume=tex_to_text(fields.get('volume', '')),
+        issue=tex_to_text(fields.get('number') or fields.get('issue', '')),
+        pages=tex_to_text(fields.get('pages', '')),
+        doi=normalize_doi(fields.get('doi', '')),
+        url=fields.get('url', '').strip(),
+        abstract=tex_to_text(fields.get('abstract', '')),
+        keywords=tex_to_text(fields.get('keywords', '')),
+        arxiv_id=arxiv_id,
+    )
+
+
+def _bibtex_arxiv(fields):
+    eprint = fields.get('eprint', '')
+    prefix = (fields.get('archiveprefix') or fields.get('eprinttype') or '').lower()
+    if eprint and (prefix == 'arxiv' or not prefix):
+        return normalize_arxiv(eprint)
+    for key in ('url', 'journal', 'note', 'howpublished'):
+        match = _ARXIV_PATTERN.search(fields.get(key, ''))
+        if match:
+            return normalize_arxiv(match.group(1))
+    return ""
+
+
+# --- CSL-JSON ----------------------------------------------------------------
+
+def parse_csl_json(text):
+    """Parse a CSL-JSON library: a list of items, or a single item."""
+    try:
+        data = json.loads(text)
+    except ValueError as exc:
+        raise ParseError("Not valid CSL-JSON: %s" % exc) from exc
+    if isinstance(data, dict):
+        data = data.get('items', [data])
+    if not isinstance(data, list):
+        raise ParseError("CSL-JSON must be a list of items.")
+    return [item for item in data if isinstance(item, dict)]
+
+
+def reference_from_csl(item):
+    """An unsaved Reference for one CSL-JSON item, or None without title and year."""
+    title = " ".join(str(item.get('title', '')).split())
+    parts = (item.get('issued') or {}).get('date-parts') or [[]]
+    date_parts = list(parts[0]) if parts and parts[0] else []
+    year = _year(str(date_parts[0]) if date_parts else str((item.get('issued') or {}).get('raw', '')))
+    if not title or not year:
+        return None
+
+    medium = CSL_MEDIUMS.get(item.get('type'), 'other')
+    arxiv_id = ""
+    for key in ('arxiv', 'URL', 'number', 'container-title', 'note'):
+        value = str(item.get(key) or '')
+        if key == 'arxiv' and value:
+            arxiv_id = normalize_arxiv(value)
+            break
+        match = _ARXIV_PATTERN.search(value)
+        if match:
+            arxiv_id = normalize_arxiv(match.group(1))
+            break
+
+    venue = str(item.get('container-title') or item.get('publisher') or '')
+    if medium in ('journal_article', 'other') and arxiv_id and (
+            not venue or 'arxiv' in venue.lower()):
+        medium = 'preprint'
+    if medium == 'preprint':
+        venue = ""
+
+    authors = []
+    for person in item.get('author') or []:
+        if person.get('literal'):
+            authors.append(person['literal'])
+        else:
+            authors.append(" ".join(bit for bit in (person.get('given'), person.get('family')) if bit))
+
+    return _build(
+        title=title,
+        authors=join_authors(authors),
+        year=year,
+        publication_date=_date(year, *(date_parts[1:3] + [None, None])[:2]),
+        medium=medium,
+        journal=venue,
+        volume=str(item.get('volume') or ''),
+        issue=str(item.get('issue') or ''),
+        pages=str(item.get('page') or '').replace('--', '–'),
+        doi=normalize_doi(item.get('DOI', '')),
+        url=str(item.get('URL') or '').strip(),
+        abstract=" ".join(str(item.get('abstract') or '').split()),
+        keywords=str(item.get('keyword') or ''),
+        arxiv_id=arxiv_id,
+    )
+
+
+# --- Shared ------------------------------------------------------------------
+
+def read_library(text, fmt):
+    """Every importable entry in ``text`` as an unsaved Reference, plus a skip count.
+
+    ``fmt`` is 'bibtex' or 'csl'. Entries without a title or year are counted
+    rather than raised on, so one bad entry does not sink a 2,000-entry file.
+    """
+    if fmt == 'bibtex':
+        built = [reference_from_bibtex(kind, fields) for kind, fields in parse_bibtex(text)
+                 if kind not in ('string',)]
+    elif fmt == 'csl':
+        built = [reference_from_csl(item) for item in parse_csl_json(text)]
+    else:
+        raise ParseError("Unknown format %r; expected 'bibtex' or 'csl'." % fmt)
+    references = [ref for ref in built if ref is not None]
+    return references, len(built) - len(references)
+
+
+def guess_format(path):
+    """'bibtex' for .bib files, 'csl' for .json, else None."""
+    lowered = str(path).lower()
+    if lowered.endswith(('.bib', '.bibtex')):
+        return 'bibtex'
+    if lowered.endswith(('.json', '.csl', '.csljson')):
+        return 'csl'
+    return None
+
+
+def _build(**values):
+    # Clip to the column widths so one overlong field cannot abort the whole
+    # batch insert on PostgreSQL.
+    for name, value in values.items():
+        max_length = getattr(Reference._meta.get_field(name), 'max_length', None)
+        if max_length and isinstance(value, str) and len(value) > max_length:
+            values[name] = value[:max_length]
+    if not values['authors']:
+        values['authors'] = Reference._meta.get_field('authors').default
+    values['status'] = 'in_review' if values['medium'] == 'preprint' else 'published'
+    values['refereed'] = values['medium'] in ('journal_article', 'conference_proceedings')
+    return Reference(**values)
+
+
+def _year(value):
+    match = re.search(r'\b(\d{4})\b', str(value or ''))
+    return int(match.group(1)) if match else None
+
+
+def _date(year, month, day):
+    """A full date only when the month is known, so the CV can order within a year."""
+    if not month:
+        return None
+    month_text = str(month).strip().lower()
+    month_number = _MONTHS.get(month_text[:3]) or (int(month_text) if month_text.isdigit() else None)
+    if not month_number or not 1 <= month_number <= 12:
+        return None
+    try:
+        return datetime.date(year, month_number, int(day) if day and str(day).isdigit() else 1)
+    except ValueError:
+        return None
+
+
+class ReferenceIndex:
+    """In-memory lookup of references by normalised DOI, arXiv id and title.
+
+    Built from one query over the existing rows and extended as new rows are
+    queued, so duplicates inside the file are caught as well as duplicates of
+    stored entries.
+    """
+
+    def __init__(self, references=()):
+        self.by_doi = {}
+        self.by_arxiv = {}
+        self.by_title = {}
+        for reference in references:
+            self.add(reference)
+
+    def add(self, reference):
+        doi = normalize_doi(reference.doi)
+        arxiv = normalize_arxiv(reference.arxiv_id)
+        title = normalize_title(reference.title)
+        if doi:
+            self.by_doi.setdefault(doi, reference)
+        if arxiv:
+            self.by_arxiv.setdefault(arxiv, reference)
+        if title:
+            self.by_title.setdefault(title, reference)
+
+    def find(self, reference):
+        """The already-known reference this one duplicates, or None.
+
+        DOI is checked first, then arXiv id, then title, so a preprint and its
+        published version match on title even though only one carries a DOI.
+        """
+        doi = normalize_doi(reference.doi)
+        if doi and doi in self.by_doi:
+            return self.by_doi[doi]
+        arxiv = normalize_arxiv(reference.arxiv_id)
+        if arxiv and arxiv in self.by_arxiv:
+            return self.by_arxiv[arxiv]
+        return self.by_title.get(normalize_title(reference.title))
@@ -0,0 +1,157 @@
+"""Static bundles: several JavaScript or CSS files served as one.
+
+Each page used to load its scripts and stylesheets one file at a time, every one
+a separate round trip to S3. In production ``collectstatic`` concatenates the
+files listed here, in order, into a single file per bundle, minifying any that
+are not already ``.min``; the bundle is then hashed like any other static file.
+With ``DEBUG`` on, the ``{% bundle %}`` tag links the individual files instead,
+so the browser's tools still show the sources as written.
+
+A CSS bundle sits in the same directory as its members, so relative ``url()``
+references in them still resolve, and ``@import`` rules are only allowed in its
+first member, since they are ignored anywhere but the top of a stylesheet.
+
+A CSS bundle listed in ``CRITICAL`` also gets a ``.critical.css`` companion:
+only the rules that style what is on screen before scrolling. Pages inline it
+and load the full bundle without blocking rendering (``{% critical_css %}``).
+"""
+
+import re
+
+import rcssmin
+import rjsmin
+
+BUNDLES = {
+    # Every page built on the HTML5 UP template, in the order it requires.
+    'js/site.js': [
+        'js/jquery.min.js',
+        'js/jquery.scrolly.min.js',
+        'js/jquery.scrollex.min.js',
+        'js/browser.min.js',
+        'js/breakpoints.min.js',
+        'js/util.js',
+        'js/main.js',
+    ],
+    # The landing page and /demo/, which carry the sheaf demo's launcher and panel.
+    'css/home.css': [
+        'css/main.css',
+        'css/sheaf-demo.css',
+    ],
+    # Pages without the demo; sheaf-demo.css restyles #title, so it stays out.
+    'css/page.css': [
+        'css/main.css',
+    ],
+}
+
+
+def minify(name, text):
+    """Minify one member, unless it already is."""
+    if '.min.' in name:
+        return text
+    if name.endswith('.js'):
+        return rjsmin.jsmin(text, keep_bang_comments=True)
+    if name.endswith('.css'):
+        return rcssmin.cssmin(text, keep_bang_comments=True)
+    return text
+
+
+def build(name, read):
+    """The content of bundle ``name``, with ``read(member)`` giving each member's text."""
+    parts = [minify(member, read(member)).strip() for member in BUNDLES[name]]
+    # A newline and a semicolon between scripts, so that one ending without a
+    # semicolon cannot run on into an IIFE at the start of the next.
+    separator = '\n;\n' if name.endswith('.js') else '\n'
+    return separator.join(parts) + '\n'
+
+
+# What each page shows before scrolling: on the landing page, the header, the
+# title section and the bio. A rule is critical when one of its selectors names
+# nothing outside these. Keep in step with the markup in index.html.
+CRITICAL = {
+    'css/home.css': {
+        'elements': {'html', 'body', 'div', 'span', 'section', 'article', 'header',
+                     'h2', 'h3', 'p', 'a', 'ul', 'li', 'i', 'img', 'picture',
+                     'strong', 'b', 'em'},
+        'ids': {'page-wrapper', 'header', 'construction-notice', 'title', 'bio'},
+        'classes': {'homepage', 'is-preload', 'wrapper', 'style2', 'container', 'special',
+                    'row', 'aln-middle', 'col-4', 'col-8', 'col-12', 'col-12-mobile',
+                    'bio-title', 'bio-subtitle', 'actions', 'button', 'bio-button',
+                    'mobile-headshot', 'connect-icons', 'icons', 'label', 'bio-content',
+                    'bio-desktop', 'bio-mobile', 'bio-image', 'image', 'fit'},
+    },
+}
+
+_PSEUDO = re.compile(r'::?[\w-]+(\([^)]*\))?')
+_ATTRIBUTE = re.compile(r'\[[^\]]*\]')
+_COMBINATOR = re.compile(r'\s*[>+~]\s*|\s+')
+_SIMPLE = re.compile(r'([#.]?)([\w-]+|\*)')
+
+
+def critical_name(name):
+    """``css/home.css`` -> ``css/home.critical.css``."""
+    stem, dot, extension = name.rpartition('.')
+    return f'{stem}.critical.{extension}'
+
+
+def critical(css, above_the_fold):
+    """The rules of ``css`` whose selectors name only what ``above_the_fold`` lists.
+
+    ``@media`` blocks are kept with whichever of their rules qualify. ``@import``,
+    ``@font-face``, ``@keyframes`` and the like are left to the full stylesheet.
+    """
+    return ''.join(_critical_rules(rcssmin.cssmin(css), above_the_fold))
+
+
+def _critical_rules(css, above_the_fold):
+    for prelude, body in _blocks(css):
+        if prelude.startswith('@media'):
+            inner = ''.join(_critical_rules(body, above_the_fold))
+            if inner:
+                yield f'{prelude}{{{inner}}}'
+        elif prelude.startswith('@') or body is None:
+            continue
+        else:
+            selectors = [selector for selector in prelude.split(',')
+                         if _is_critical(selector, above_the_fold)]
+            if selectors:
+                yield f"{','.join(selectors)}{{{body}}}"
+
+
+def _blocks(css):
+    """Split minified CSS into (prelude, body) pairs; body is None for ``@x ...;``."""
+    i, depth, start, prelude, quote = 0, 0, 0, None, None
+    while i < len(css):
+        char = css[i]
+        if quote:
+            if char == '\\':
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == ';' and depth == 0:
+            yield css[start:i].strip(), None
+            start = i + 1
+        elif char == '{':
+            if depth == 0:
+                prelude, start = css[start:i].strip(), i + 1
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                yield prelude, css[start:i]
+                start = i + 1
+        i += 1
+
+
+def _is_critical(selector, above_the_fold):
+    selector = _ATTRIBUTE.sub('', _PSEUDO.sub('', selector)).strip()
+    if not selector:
+        return False
+    for compound in _COMBINATOR.split(selector):
+        for kind, name in _SIMPLE.findall(compound):
+            allowed = {'#': above_the_fold['ids'], '.': above_the_fold['classes'],
+                       '': above_the_fold['elements'] | {'*'}}[kind]
+            if name not in allowed:
+                return False
+    return True
@@ -11,14 +11,18 @@ CV:
 
 Every ``build_*`` function returns a list of LaTeX lines and returns an empty
 list when it has no data, so sections that have not been filled in yet are
-skipped rather than printed empty.
+skipped rather than printed empty. Every query is narrowed to the profile's
+own rows with ``owned_by``, so each site's CV lists only its own work.
 
 Typesetting lives in ``academic/tex/academic-cv.sty``.
 """
 
 import datetime
+import functools
 import re
 
+from django.db.models import Prefetch
+
 from .models import (Award, Course, DeliveredProduct, Education, Experience,
                      Grant, PUBLICATION_CATEGORIES, PUBLICATION_CATEGORY_ORDER,
                      Innovation, Proposal, Reference, Review, Service, Student,
@@ -282,9 +286,14 @@ def format_talk(talk, profile):
 
 def _initialled_name(profile):
     """"Hans Riess, Ph.D." -> "H. Riess", the form used in the citation lists."""
-    parts = profile.name_parts()
+    return _initialled(tuple(profile.name_parts()))
+
+
+@functools.lru_cache(maxsize=32)
+def _initialled(parts):
+    # Called once per talk in the CV, always with the same name.
     if len(parts) < 2:
-        return profile.plain_name()
+        return " ".join(parts)
     initials = " ".join("%s." % p[0] for p in parts[:-1])
     return "%s %s" % (initials, parts[-1])
 
@@ -320,7 +329,7 @@ def build_preamble_sections(profile):
         return []
 
     lines = []
-    educations = Education.objects.order_by('-graduation_year')
+    educations = Education.objects.owned_by(profile).order_by('-graduation_year')
     if educations.exists():
         lines.append(r'\cvminihead{Education}')
         for item in educations:
@@ -335,7 +344,7 @@ def build_preamble_sections(profile):
             lines.append(r'\cvpreentry{%s}{%s}{%s}' % (
                 degree, ", ".join(where), item.graduation_year))
 
-    experiences = Experience.objects.order_by('-start_date')
+    experiences = Experience.objects.owned_by(profile).order_by('-start_date').defer('description')
     if experiences.exists():
         lines.append(r'\cvminihead{Professional Appointments}')
         for item in experiences:
@@ -367,7 +376,7 @@ def build_section_i(profile):
     blocks = [
         _thesis_block(profile),
         _publications_block(profile),
-        _delivered_products_block(),
+        _delivered_products_block(profile),
         _awards_block(profile),
         _knowledge_sharing_block(profile),
     ]
@@ -378,7 +387,7 @@ def build_section_i(profile):
 
 
 def _thesis_block(profile):
-    theses = Education.objects.filter(is_dissertation=True).order_by('-graduation_year')
+    theses = Education.objects.owned_by(profile).filter(is_dissertation=True).order_by('-graduation_year')
     theses = [t for t in theses if t.thesis_title]
     if not theses:
         return []
@@ -417,7 +426,8 @@ def _publications_block(profile):
     grouped = {key: [] for key in PUBLICATION_CATEGORY_ORDER}
 
     listed_reference_ids = set()
-    for ref in Reference.objects.all():
+    # The CV cites; it never prints an abstract.
+    for ref in Reference.objects.owned_by(profile).defer('abstract', 'keywords', 'reference_image_derivatives'):
         if not ref.show_on_cv(show_all):
             continue
         category = ref.get_category()
@@ -425,7 +435,7 @@ def _publications_block(profile):
             grouped[category].append((ref.cv_sort_key(), ref))
             listed_reference_ids.add(ref.pk)
 
-    for talk in Talk.objects.all():
+    for talk in Talk.objects.owned_by(profile).defer('abstract'):
         if talk.reference_id and talk.reference_id in listed_reference_ids:
             continue
         category = talk.get_category()
@@ -450,8 +460,8 @@ def _publications_block(profile):
     return lines
 
 
-def _delivered_products_block():
-    products = DeliveredProduct.objects.all()
+def _delivered_products_block(profile):
+    products = DeliveredProduct.objects.owned_by(profile)
     if not products.exists():
         return []
 
@@ -479,7 +489,7 @@ def _delivered_products_block():
 
 
 def _awards_block(profile):
-    awards = Award.objects.all()
+    awards = Award.objects.owned_by(profile)
     if not awards.exists():
         return []
 
@@ -500,7 +510,7 @@ def _awards_block(profile):
 def _knowledge_sharing_block(profile):
     """Section I.E, from courses and workshops taught plus tutorial lectures."""
     rows = []
-    for course in Course.objects.all():
+    for course in Course.objects.owned_by(profile).defer('description'):
         when = datetime.date(course.year, 12, 31) if course.year else None
         rows.append((when, [
             clean(course.get_cv_organization()),
@@ -510,7 +520,7 @@ def _knowledge_sharing_block(profile):
             clean(course.attendee_count),
         ]))
 
-    for talk in Talk.objects.all():
+    for talk in Talk.objects.owned_by(profile).defer('abstract', 'note'):
         if not talk.is_knowledge_sharing():
             continue
         rows.append((talk.date, [
@@ -534,17 +544,18 @@ def _knowledge_sharing_block(profile):
 
 # --- Section II --------------------------------------------------------------
 
-def build_section_ii():
-    blocks = [_reports_block(), _innovations_block()]
+def build_section_ii(profile):
+    blocks = [_reports_block(profile), _innovations_block(profile)]
     body = [line for block in blocks for line in block]
     if not body:
         return []
     return [r'\cvsection{Technical Contributions and Innovation}'] + body
 
 
-def _reports_block():
+def _reports_block(profile):
     """Section II.A: one numbered report series per award that has reports."""
-    grants = [g for g in Grant.objects.all() if g.tech_reports.exists()]
+    grants = Grant.objects.owned_by(profile).only('title', 'short_title', 'report_series_note')
+    grants = [g for g in grants.prefetch_related('tech_reports') if g.tech_reports.all()]
     if not grants:
         return []
 
@@ -571,8 +582,8 @@ def _reports_block():
     return lines
 
 
-def _innovations_block():
-    innovations = Innovation.objects.all()
+def _innovations_block(profile):
+    innovations = Innovation.objects.owned_by(profile).prefetch_related('grants')
     if not innovations.exists():
         return []
 
@@ -599,7 +610,7 @@ def _innovations_block():
 # --- Section III -------------------------------------------------------------
 
 def build_section_iii(profile):
-    blocks = [_funded_research_block(profile), _student_guidance_block()]
+    blocks = [_funded_research_block(profile), _student_guidance_block(profile)]
     body = [line for block in blocks for line in block]
     if not body:
         return []
@@ -607,7 +618,8 @@ def build_section_iii(profile):
 
 
 def _funded_research_block(profile):
-    grants = Grant.objects.all()
+    grants = Grant.objects.owned_by(profile).defer(
+        'description', 'report_series_note', 'image_derivatives', 'sponsor_logo_derivatives')
     if not grants.exists():
         return []
 
@@ -635,7 +647,7 @@ def _funded_research_block(profile):
 
 
 def _proposals_block(profile):
-    proposals = Proposal.objects.all()
+    proposals = Proposal.objects.owned_by(profile)
     if not proposals.exists():
         return []
 
@@ -685,8 +697,9 @@ def _submission_cell(proposal):
     return r' \par '.join(bits)
 
 
-def _student_guidance_block():
-    students = Student.objects.order_by('-start_date')
+def _student_guidance_block(profile):
+    students = Student.objects.owned_by(profile).order_by('-start_date').prefetch_related(
+        Prefetch('resulting_publications', queryset=Reference.objects.only('cv_ref_slug')))
     if not students.exists():
         return []
 
@@ -746,11 +759,11 @@ def build_section_v(profile):
     """Section V, from Review (subsections A and B) and Service (C onwards)."""
     grouped = {key: [] for key, _ in SERVICE_ORDER}
 
-    for review in Review.objects.all():
+    for review in Review.objects.owned_by(profile):
         category = review.get_category()
         if category in grouped:
             grouped[category].append((review, _review_entry(review, profile)))
-    for service in Service.objects.order_by('-year', 'title'):
+    for service in Service.objects.owned_by(profile).order_by('-year', 'title'):
         category = service.get_category()
         if category in grouped:
             grouped[category].append((service, _service_entry(service, profile)))
@@ -823,7 +836,7 @@ def build_document(profile):
     ]
     lines.extend(build_header(profile))
     lines.extend(build_section_i(profile))
-    lines.extend(build_section_ii())
+    lines.extend(build_section_ii(profile))
     lines.extend(build_section_iii(profile))
     lines.extend(build_section_iv(profile))
     lines.extend(build_section_v(profile))
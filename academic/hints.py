@@ -0,0 +1,80 @@
+"""``Link`` preload and preconnect headers, sent early where the server can.
+
+A page's stylesheets and scripts come from the static origin (S3 in production)
+and its fonts and icons from third parties. The browser finds out about them
+only once it parses the HTML, and each new origin costs a DNS lookup and a TLS
+handshake first. ``link_hints`` names them in ``Link`` headers on the response,
+so the fetches and handshakes overlap the rest of the download. Hosts and CDNs
+that understand ``Link`` can send them ahead as ``103 Early Hints``.
+
+Where a WSGI server offers ``wsgi.early_hints`` the headers also go out as a
+``103 Early Hints`` response before the view runs, overlapping them with
+rendering too. That only happens under ``hansriess.wsgi``: ASGI has no
+equivalent, so under the Uvicorn workers the ``Procfile`` runs it never fires,
+and the ``Link`` header is all that is sent.
+"""
+
+from functools import wraps
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from academic.bundles import BUNDLES
+from academic.templatetags.static_bundles import bundle_urls, compressed_url
+
+# Origins every page fetches from besides our own: Google Fonts, which main.css
+# imports, and Font Awesome's kit and stylesheet. Fonts are CORS requests, and so
+# is the kit script (crossorigin="anonymous"), so those connections are opened
+# in CORS mode; the cdnjs stylesheet is fetched the same way.
+THIRD_PARTY_ORIGINS = [
+    ('https://fonts.googleapis.com', False),
+    ('https://fonts.gstatic.com', True),
+    ('https://kit.fontawesome.com', True),
+    ('https://ka-f.fontawesome.com', True),
+    ('https://cdnjs.cloudflare.com', True),
+]
+
+
+def static_origin():
+    """The scheme and host static files are served from, if not this site."""
+    parts = urlsplit(settings.STATIC_URL)
+    return f'{parts.scheme}://{parts.netloc}' if parts.netloc else None
+
+
+def links(request, preload):
+    """``Link`` header values for ``preload``, a list of (static name, ``as``) pairs."""
+    values = []
+    origin = static_origin()
+    if origin:
+        values.append(f'<{origin}>; rel=preconnect')
+    values.extend(f'<{url}>; rel=preconnect' + ('; crossorigin' if cors else '')
+                  for url, cors in THIRD_PARTY_ORIGINS)
+    for name, destination in preload:
+        urls = bundle_urls(request, name) if name in BUNDLES else [compressed_url(request, name)]
+        values.extend(f'<{url}>; rel=preload; as={destination}' for url in urls)
+    return values
+
+
+def link_hints(*preload):
+    """View decorator: announce the page's critical assets before its HTML.
+
+        @link_hints(('css/home.css', 'style'), ('js/site.js', 'script'))
+
+    Each pair is a static file or bundle name and the ``as`` of its preload; a
+    preload only helps if its URL is exactly the one the page then uses, which
+    is why these go through the same helpers as the page's template tags.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            values = links(request, preload)
+            # Absent under ASGI; see the module docstring.
+            early_hints = request.META.get('wsgi.early_hints')
+            if callable(early_hints):
+                early_hints([('Link', value) for value in values])
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.has_header('Link'):
+                response['Link'] = ', '.join(values)
+            return response
+        return wrapped
+    return decorator
@@ -0,0 +1,145 @@
+"""Resized copies of uploaded images, for ``srcset``.
+
+Headshots, grant images and the like are uploaded at whatever resolution the
+camera produced and were served that way. Each one now also gets a few fixed
+widths in WebP and JPEG, stored next to the original under content-hashed
+names. A hashed name never changes content, so storage and browsers can cache
+it forever, and re-uploading the same file costs nothing.
+
+What was generated is recorded in a ``<field>_derivatives`` JSON column beside
+each image field, so rendering a ``srcset`` needs no storage or database I/O:
+
+    {"source": "profile/headshot.jpg", "width": 2400, "height": 3000,
+     "jpeg": {"320": "profile/headshot.1a2b3c4d5e.320w.jpg", ...},
+     "webp": {"320": "profile/headshot.1a2b3c4d5e.320w.webp", ...}}
+"""
+
+import hashlib
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Widths generated for every image. Anything at or above the original's width
+# is skipped; an image narrower than all of them gets one copy at its own width.
+WIDTHS = (320, 640, 1280)
+
+# Pillow format name, file extension and save options for each output.
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 6}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# (model label, image field) for every image served on the site.
+IMAGE_FIELDS = [
+    ('academic.Profile', 'headshot'),
+    ('academic.Grant', 'image'),
+    ('academic.Grant', 'sponsor_logo'),
+    ('academic.Figure', 'image'),
+    ('academic.Collaborator', 'headshot'),
+    ('academic.Reference', 'reference_image'),
+]
+
+
+def image_fields(model):
+    """The image fields of ``model`` that get derivatives."""
+    return [field for label, field in IMAGE_FIELDS if label == model._meta.label]
+
+
+def derivatives_field(field_name):
+    """The JSON column that records ``field_name``'s derivatives."""
+    return f'{field_name}_derivatives'
+
+
+def is_current(fieldfile, derivatives):
+    """Whether ``derivatives`` were generated from the file now in ``fieldfile``."""
+    if not fieldfile:
+        return not derivatives
+    return bool(derivatives) and derivatives.get('source') == fieldfile.name
+
+
+def generate(fieldfile):
+    """Write the derivatives of ``fieldfile`` to its storage and describe them.
+
+    Returns the dictionary to store in the ``_derivatives`` column: empty when
+    the field is, and with no sizes when the file cannot be read as an image, so
+    that it is not retried on every save. Files whose hashed name already exists
+    are not written again.
+    """
+    if not fieldfile:
+        return {}
+    try:
+        fieldfile.open('rb')
+        try:
+            data = fieldfile.read()
+        finally:
+            fieldfile.close()
+        original = Image.open(io.BytesIO(data))
+        original = ImageOps.exif_transpose(original)
+        original.load()
+    except (OSError, UnidentifiedImageError, ValueError):
+        logger.warning("Could not read %s as an image; serving it unresized.", fieldfile.name)
+        return {'source': fieldfile.name}
+
+    storage = fieldfile.storage
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    stem, _ = os.path.splitext(fieldfile.name)
+    width, height = original.size
+
+    widths = [w for w in WIDTHS if w < width] or [width]
+    result = {'source': fieldfile.name, 'width': width, 'height': height}
+    for key, (pil_format, extension, options) in FORMATS.items():
+        result[key] = {}
+        for target in widths:
+            name = f'{stem}.{digest}.{target}w.{extension}'
+            if not storage.exists(name):
+                resized = _resize(original, target)
+                resized = _flatten(resized) if pil_format == 'JPEG' else _rgb_or_rgba(resized)
+                buffer = io.BytesIO()
+                resized.save(buffer, pil_format, **options)
+                name = storage.save(name, ContentFile(buffer.getvalue()))
+            result[key][str(target)] = name
+    return result
+
+
+def refresh(instance, field_name, force=False):
+    """Regenerate one field's derivatives if they are stale. True if it wrote."""
+    fieldfile = getattr(instance, field_name)
+    column = derivatives_field(field_name)
+    if not force and is_current(fieldfile, getattr(instance, column)):
+        return False
+    derivatives = generate(fieldfile)
+    setattr(instance, column, derivatives)
+    # update() rather than save(), so this neither re-enters the post_save
+    # handler nor touches updated_at.
+    type(instance).objects.filter(pk=instance.pk).update(**{column: derivatives})
+    return True
+
+
+def _resize(image, width):
+    if image.width <= width:
+        return image.copy()
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _rgb_or_rgba(image):
+    return image.convert('RGBA' if _has_alpha(image) else 'RGB')
+
+
+def _flatten(image):
+    """JPEG has no alpha, so composite transparent images onto white."""
+    if _has_alpha(image):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
@@ -0,0 +1,74 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from academic import benchmarks
+
+
+class Command(BaseCommand):
+    help = ('Times the CV builder, the landing page, a project page and the redirect views '
+            'against synthetic data of several sizes, and prints wall time, query count and '
+            'peak memory as JSON. Runs in a throwaway test database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                            help='Dataset sizes to seed and time (default 100 1000 10000).')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timed runs per scenario; the median is reported (default 5).')
+        parser.add_argument('--cold', action='store_true',
+                            help='Empty the cache before every run instead of timing it warm.')
+        parser.add_argument('--only', nargs='+', metavar='SCENARIO',
+                            help='Time only these scenarios.')
+        parser.add_argument('--baseline', help='A saved report to compare against.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Growth in time or memory that counts as a regression (default 0.2).')
+        parser.add_argument('--save', metavar='PATH', help='Also write the report to PATH.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as f:
+                    baseline = json.load(f)['results']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Could not read the baseline {options['baseline']}: {e}")
+
+        creation = connection.creation
+        old_name = connection.settings_dict['NAME']
+        creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = {str(size): self._run(size, options) for size in options['sizes']}
+        finally:
+            creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {'repeat': options['repeat'], 'cold': options['cold'], 'results': results}
+        problems = benchmarks.compare(results, baseline, options['tolerance']) if baseline else []
+        if baseline:
+            report['regressions'] = problems
+
+        output = json.dumps(report, indent=2)
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
+        if problems:
+            raise CommandError("%d regression(s) against %s:\n%s"
+                               % (len(problems), options['baseline'], "\n".join(problems)))
+
+    def _run(self, size, options):
+        with transaction.atomic():
+            benchmarks.clear()
+            benchmarks.seed(size)
+        scenarios = benchmarks.scenarios()
+        if options['only']:
+            unknown = set(options['only']) - set(scenarios)
+            if unknown:
+                raise CommandError("Unknown scenario(s): %s. Choose from %s."
+                                   % (", ".join(sorted(unknown)), ", ".join(scenarios)))
+            scenarios = {name: scenarios[name] for name in options['only']}
+        results = {}
+        for name, run in scenarios.items():
+            self.stderr.write(f"{name} at {size}...")
+            results[name] = benchmarks.measure(run, repeat=options['repeat'], cold=options['cold'])
+        return results
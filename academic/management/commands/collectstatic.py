@@ -0,0 +1,25 @@
+from django.contrib.staticfiles.management.commands.collectstatic import (
+    Command as CollectStaticCommand)
+
+
+class Command(CollectStaticCommand):
+    """collectstatic, reporting which files the storage actually uploaded.
+
+    With `academic.storage.ManifestS3Storage` every file counts as "copied", since
+    unchanged ones are only recognised by content once they reach the storage.
+    This finishes the storage's sync and says what really went up. `academic`
+    comes before `django.contrib.staticfiles` in INSTALLED_APPS so that this
+    command takes precedence.
+    """
+
+    def collect(self):
+        collected = super().collect()
+        finish_sync = getattr(self.storage, 'finish_sync', None)
+        if finish_sync is not None and not self.dry_run:
+            uploaded, skipped = finish_sync()
+            for name in uploaded:
+                self.log(f"Uploaded '{name}'", level=2)
+            if self.verbosity >= 1:
+                self.stdout.write(f"{len(uploaded)} file(s) uploaded, "
+                                  f"{len(skipped)} unchanged and skipped.")
+        return collected
@@ -1,49 +1,82 @@
 import logging
+import multiprocessing
 import os
 import shutil
 import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
 
+import django
+from django.apps import apps
 from django.conf import settings
 from django.core.files import File
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 
 from academic.cv_builder import build_document
 from academic.models import Profile
+from academic.repeated_queries import WatchedCommandMixin
+from academic.routers import replica_reads
+from academic.tenants import profile_for
 
 logger = logging.getLogger(__name__)
 
 
-class Command(BaseCommand):
+class Command(WatchedCommandMixin, BaseCommand):
     help = ('Generates the CV as a PDF in the official Georgia Tech format from '
             'database content and handles storage for development and production.')
 
     def add_arguments(self, parser):
         parser.add_argument(
             '--keep-tex', action='store_true',
-            help='Leave the generated cv.tex and cv.log in temp_cv/ for inspection.',
+            help='Leave the generated cv.tex and cv.log in temp_cv/<profile pk>/ for inspection.',
         )
         parser.add_argument(
             '--no-save', action='store_true',
             help='Compile the PDF but do not attach it to the profile.',
         )
+        parser.add_argument(
+            '--profile',
+            help="Whose CV: a profile's pk or domain. Defaults to the default site's.",
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Rebuild every profile's CV, several at once, and exit non-zero if any fails.",
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Processes to build with under --all (default: one per CPU).',
+        )
 
     def handle(self, *args, **options):
+        if options['all']:
+            return self._build_all(options['workers'], options['keep_tex'],
+                                   not options['no_save'])
+
         self.stdout.write("Starting CV generation...")
 
-        profile = Profile.objects.first()
+        profile = profile_for(options['profile'])
         if not profile:
             self.stderr.write("No profile found in the database. Aborting.")
             return
+        self.build(profile, keep_tex=options['keep_tex'], save=not options['no_save'])
 
+    def build(self, profile, keep_tex=False, save=True):
+        """Compile ``profile``'s CV and attach it; False, having said why, on failure."""
         try:
-            tex_source = build_document(profile)
+            # A snapshot of the database; the replica's is as good as any.
+            with replica_reads():
+                tex_source = build_document(profile)
         except Exception as e:
             logger.exception("Failed to build the CV LaTeX source")
             self.stderr.write(self.style.ERROR(f"Error building the CV source: {e}"))
-            return
+            return False
 
-        temp_dir = os.path.join(settings.BASE_DIR, 'temp_cv')
-        os.makedirs(temp_dir, exist_ok=True)
+        # A fresh folder per build, so that builds running at once, of the
+        # same CV or of different ones, never share or delete each other's files.
+        temp_dir = tempfile.mkdtemp(prefix=f'cv-{profile.pk}-')
 
         style_src = os.path.join(settings.BASE_DIR, 'academic', 'tex', 'academic-cv.sty')
         if os.path.exists(style_src):
@@ -51,7 +84,7 @@ class Command(BaseCommand):
         else:
             self.stderr.write(self.style.ERROR(f"Style file not found at {style_src}. Aborting."))
             shutil.rmtree(temp_dir, ignore_errors=True)
-            return
+            return False
 
         tex_path = os.path.join(temp_dir, 'cv.tex')
         pdf_path = os.path.join(temp_dir, 'cv.pdf')
@@ -61,42 +94,84 @@ class Command(BaseCommand):
         except OSError as e:
             self.stderr.write(self.style.ERROR(f"Error writing .tex file: {e}"))
             shutil.rmtree(temp_dir, ignore_errors=True)
-            return
+            return False
 
         if not self._compile(tex_path, temp_dir):
-            self._keep_or_clean(temp_dir, options['keep_tex'])
-            return
+            self._keep_or_clean(temp_dir, keep_tex, profile)
+            return False
 
         if not os.path.exists(pdf_path):
             self.stderr.write(self.style.ERROR(f"PDF was not generated at {pdf_path}. Check cv.log."))
-            self._keep_or_clean(temp_dir, options['keep_tex'])
-            return
+            self._keep_or_clean(temp_dir, keep_tex, profile)
+            return False
 
         self.stdout.write(self.style.SUCCESS(f"Successfully generated cv.pdf in {temp_dir}"))
 
-        if options['no_save']:
+        if not save:
             self.stdout.write("--no-save given; leaving the profile untouched.")
-            self._keep_or_clean(temp_dir, options['keep_tex'])
-            return
+            self._keep_or_clean(temp_dir, keep_tex, profile)
+            return True
 
         try:
+            previous = profile.cv.name
             with open(pdf_path, 'rb') as pdf:
                 # Delete the old file first so the stored name stays cv.pdf.
                 if profile.cv:
                     profile.cv.delete(save=False)
-                profile.cv.save('cv.pdf', File(pdf), save=True)
+                profile.cv.save('cv.pdf', File(pdf), save=False)
+            # A CV-only save leaves every process's cached profile alone, which
+            # still names the right file unless the name changed.
+            profile.save(update_fields=['cv', 'updated_at'])
+            if profile.cv.name != previous:
+                Profile.invalidate_current()
         except Exception as e:
             logger.exception("Failed to save the generated CV")
             self.stderr.write(self.style.ERROR(f"Failed to save or upload CV: {e}"))
-            self._keep_or_clean(temp_dir, options['keep_tex'])
-            return
+            self._keep_or_clean(temp_dir, keep_tex, profile)
+            return False
 
         if settings.PRODUCTION:
             self.stdout.write(self.style.SUCCESS(f"Uploaded {profile.cv.name} to the profile."))
         else:
             self.stdout.write(self.style.SUCCESS(f"Saved new CV to {profile.cv.path}"))
 
-        self._keep_or_clean(temp_dir, options['keep_tex'])
+        self._keep_or_clean(temp_dir, keep_tex, profile)
+        return True
+
+    def _build_all(self, workers, keep_tex, save):
+        """Every profile's CV, across a pool of worker processes.
+
+        pdflatex is single-threaded and most of each build, so the builds run
+        side by side, each in a temporary folder of its own and each worker on a
+        database connection of its own.
+        """
+        pks = list(Profile.objects.order_by('pk').values_list('pk', flat=True))
+        if not pks:
+            raise CommandError("No profile found in the database.")
+        workers = max(1, min(workers, len(pks)))
+        self.stdout.write(f"Rebuilding {len(pks)} CVs with {workers} workers...")
+
+        # A forked worker must not inherit an open connection: it would share
+        # the socket with this process. Each opens its own on first use.
+        connections.close_all()
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_context(),
+                                 initializer=_init_worker) as pool:
+            results = list(pool.map(_build_one, pks, [keep_tex] * len(pks), [save] * len(pks)))
+        elapsed = time.perf_counter() - start
+        # The workers' saves invalidated only their own copies of the profiles.
+        Profile.invalidate_current()
+
+        failed = 0
+        for pk, name, ok, seconds, error in results:
+            status = self.style.SUCCESS("ok") if ok else self.style.ERROR("FAILED")
+            self.stdout.write(f"{pk:>5}  {name:<30.30}  {seconds:7.1f} s  {status}")
+            if not ok:
+                failed += 1
+                self.stdout.write(f"       {error}")
+        self.stdout.write(f"{len(pks) - failed} of {len(pks)} CVs rebuilt in {elapsed:.1f} s.")
+        if failed:
+            raise CommandError(f"{failed} of {len(pks)} CVs failed to build.")
 
     def _compile(self, tex_path, temp_dir):
         """Run pdflatex twice. The first pass populates cross-references, so it is
@@ -138,12 +213,48 @@ class Command(BaseCommand):
         else:
             self.stderr.write(f"See {log_path} for details.")
 
-    def _keep_or_clean(self, temp_dir, keep):
+    def _keep_or_clean(self, temp_dir, keep, profile):
+        """Remove the build folder, first copying its output to temp_cv/<pk>/ if asked."""
         if keep:
-            self.stdout.write(f"Leaving build files in {temp_dir}.")
-            return
+            kept = os.path.join(settings.BASE_DIR, 'temp_cv', str(profile.pk))
+            os.makedirs(kept, exist_ok=True)
+            for name in ('cv.tex', 'cv.log', 'cv.pdf'):
+                if os.path.exists(os.path.join(temp_dir, name)):
+                    shutil.copy2(os.path.join(temp_dir, name), kept)
+            self.stdout.write(f"Leaving build files in {kept}.")
         try:
             shutil.rmtree(temp_dir)
             self.stdout.write("Cleaned up temporary directory.")
         except OSError as e:
             self.stderr.write(f"Error removing temporary directory {temp_dir}: {e}")
+
+
+def _context():
+    # Fork where there is one: workers start with Django set up and the same
+    # settings, including a test database's name.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+
+
+def _init_worker():
+    if not apps.ready:  # spawned rather than forked
+        django.setup()
+
+
+def _build_one(pk, keep_tex, save):
+    """In a worker: one profile's CV, as (pk, name, ok, seconds, first error line)."""
+    start = time.perf_counter()
+    out, err = StringIO(), StringIO()
+    profile = Profile.objects.filter(pk=pk).first()
+    name = profile.name if profile else "(deleted)"
+    try:
+        ok = bool(profile) and Command(stdout=out, stderr=err).build(
+            profile, keep_tex=keep_tex, save=save)
+    except Exception as e:
+        logger.exception("Failed to build the CV of profile %s", pk)
+        err.write(f"{type(e).__name__}: {e}")
+        ok = False
+    finally:
+        connections.close_all()
+    lines = [line for line in err.getvalue().splitlines() if line.strip()]
+    return pk, name, ok, time.perf_counter() - start, lines[0] if lines else ""
@@ -0,0 +1,27 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from academic import images
+
+
+class Command(BaseCommand):
+    help = ('Generates the resized WebP and JPEG copies of every uploaded image '
+            'that does not have current ones yet.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regenerate every image, even those whose copies are current.',
+        )
+
+    def handle(self, *args, **options):
+        generated = 0
+        for label, field_name in images.IMAGE_FIELDS:
+            model = apps.get_model(label)
+            column = images.derivatives_field(field_name)
+            rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            for instance in rows.only('pk', field_name, column):
+                if images.refresh(instance, field_name, force=options['force']):
+                    generated += 1
+                    self.stdout.write(f"{label}.{field_name}: {getattr(instance, field_name).name}")
+        self.stdout.write(self.style.SUCCESS(f"Generated derivatives for {generated} image(s)."))
@@ -0,0 +1,111 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from academic.bibliography import (IMPORTED_FIELDS, ParseError, ReferenceIndex,
+                                   guess_format, read_library)
+from academic.models import Reference
+from academic.repeated_queries import WatchedCommandMixin
+from academic.tenants import profile_for
+
+
+class Command(WatchedCommandMixin, BaseCommand):
+    help = ('Imports publications from BibTeX or CSL-JSON files, skipping any that '
+            'match an existing reference by DOI, arXiv id or title.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='.bib or .json files to import.')
+        parser.add_argument(
+            '--format', choices=['bibtex', 'csl'],
+            help='Input format. Guessed from the file extension when omitted.',
+        )
+        parser.add_argument(
+            '--update', action='store_true',
+            help='Fill in blank fields on references that already exist. '
+                 'Fields that already have a value are never overwritten.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report what would be imported without writing anything.',
+        )
+        parser.add_argument(
+            '--profile',
+            help="Whose site to import into: a profile's pk or domain. Defaults to the "
+                 "default site's, leaving the new references unowned.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Rows per INSERT/UPDATE statement (default 500).',
+        )
+
+    def handle(self, *args, **options):
+        profile = profile_for(options['profile'])
+        if options['profile'] and not profile:
+            raise CommandError(f"No profile with pk or domain {options['profile']!r}.")
+        owner = profile if options['profile'] else None
+
+        incoming = []
+        skipped = 0
+        for path in options['paths']:
+            fmt = options['format'] or guess_format(path)
+            if not fmt:
+                raise CommandError(f"Cannot tell the format of {path}; pass --format.")
+            try:
+                with open(path, encoding='utf-8') as f:
+                    references, missing = read_library(f.read(), fmt)
+            except (OSError, ParseError) as e:
+                raise CommandError(f"Could not read {path}: {e}")
+            incoming.extend(references)
+            skipped += missing
+
+        # One query for everything already on the site; every lookup after this
+        # is a dictionary hit. Other sites' references are neither matched nor
+        # updated.
+        index = ReferenceIndex(Reference.objects.owned_by(profile).only('pk', *IMPORTED_FIELDS))
+
+        to_create, to_update, duplicates = [], {}, 0
+        for reference in incoming:
+            match = index.find(reference)
+            if match is None:
+                reference.owner = owner
+                to_create.append(reference)
+                index.add(reference)
+                continue
+            duplicates += 1
+            if options['update'] and match.pk and _fill_blanks(match, reference):
+                to_update[match.pk] = match
+
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {skipped} entr{'y' if skipped == 1 else 'ies'} with no title or year."))
+
+        if options['dry_run']:
+            self.stdout.write(f"Dry run: would create {len(to_create)}, update {len(to_update)}, "
+                              f"and skip {duplicates} duplicate(s).")
+            return
+
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            Reference.objects.bulk_create(to_create, batch_size=batch_size)
+            if to_update:
+                # bulk_update skips auto_now, and the landing page's publication
+                # sections are cached on the latest updated_at of each medium.
+                now = timezone.now()
+                for reference in to_update.values():
+                    reference.updated_at = now
+                Reference.objects.bulk_update(to_update.values(), [*IMPORTED_FIELDS, 'updated_at'],
+                                              batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(to_create)}, updated {len(to_update)}, "
+            f"skipped {duplicates} duplicate(s)."))
+
+
+def _fill_blanks(existing, incoming):
+    """Copy values onto the blank fields of ``existing``. True if anything changed."""
+    changed = False
+    for name in IMPORTED_FIELDS:
+        if not getattr(existing, name) and getattr(incoming, name):
+            setattr(existing, name, getattr(incoming, name))
+            changed = True
+    return changed
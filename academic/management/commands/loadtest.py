@@ -0,0 +1,203 @@
+import http.client
+import json
+import math
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import uvicorn
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+
+from academic.models import Grant, Profile, Reference
+
+# Route -> share of requests, roughly what a shared link brings in.
+DEFAULT_MIX = {'/': 50, '/paper/<slug>/': 20, '/project/<slug>/': 10, '/cv/': 10, '/demo/': 10}
+
+LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1'}
+
+
+class Command(BaseCommand):
+    help = ('Drives concurrent requests at the public pages, with real slugs from the database, '
+            'and reports throughput, latency percentiles and errors per route. Serves the site '
+            'in-process unless --url points at a local server.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Timed requests in total (default 500).')
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='Requests in flight at once (default 8).')
+        parser.add_argument('--warmup', type=int, default=20,
+                            help='Untimed requests first, to fill caches (default 20).')
+        parser.add_argument('--url',
+                            help='A running local server, e.g. http://127.0.0.1:8000, instead '
+                                 'of serving in-process. Only local hosts are allowed.')
+        parser.add_argument('--mix', nargs='+', metavar='ROUTE=WEIGHT',
+                            help="Weights replacing the default mix, e.g. /=3 '/cv/=1'.")
+        parser.add_argument('--seed', type=int, default=0, help='Seed for picking routes and slugs.')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+
+    def handle(self, *args, **options):
+        mix = self._mix(options['mix'])
+        paths = self._paths(mix, random.Random(options['seed']),
+                            options['warmup'] + options['requests'])
+
+        stop = None
+        if options['url']:
+            target = urlsplit(options['url'])
+            if target.scheme != 'http' or target.hostname not in LOCAL_HOSTS:
+                raise CommandError("--url must be a plain http:// URL on this machine.")
+            host, port = target.hostname, target.port or 80
+        else:
+            stop, host, port = self._serve()
+        try:
+            self._run(host, port, paths[:options['warmup']], options['concurrency'])
+            started = time.perf_counter()
+            results = self._run(host, port, paths[options['warmup']:], options['concurrency'])
+            elapsed = time.perf_counter() - started
+        finally:
+            if stop:
+                stop()
+
+        report = summarise(results, elapsed)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print(report)
+
+    def _mix(self, pairs):
+        if not pairs:
+            return dict(DEFAULT_MIX)
+        mix = {}
+        for pair in pairs:
+            route, _, weight = pair.rpartition('=')
+            if route not in DEFAULT_MIX or not weight.isdigit():
+                raise CommandError(f"Expected ROUTE=WEIGHT with a route from "
+                                   f"{', '.join(DEFAULT_MIX)}; got {pair!r}.")
+            mix[route] = int(weight)
+        return mix
+
+    def _paths(self, mix, rng, count):
+        """(route, path) pairs in the proportions of ``mix``, slugs picked at random."""
+        # The requests go to 127.0.0.1, which is the default site's.
+        profile = Profile.current()
+        slugs = {
+            '/paper/<slug>/': list(Reference.objects.owned_by(profile).exclude(slug__isnull=True)
+                                   .exclude(slug='').values_list('slug', flat=True)),
+            '/project/<slug>/': list(Grant.objects.owned_by(profile).exclude(slug__isnull=True)
+                                     .exclude(slug='').values_list('slug', flat=True)),
+        }
+        for route, values in slugs.items():
+            if mix.get(route) and not values:
+                self.stderr.write(f"No rows with a slug for {route}; leaving it out.")
+                mix[route] = 0
+        routes = [route for route in mix if mix[route]]
+        if not routes:
+            raise CommandError("Nothing to request.")
+        weights = [mix[route] for route in routes]
+        paths = []
+        for route in rng.choices(routes, weights, k=count):
+            path = route.replace('<slug>', rng.choice(slugs[route])) if route in slugs else route
+            paths.append((route, path))
+        return paths
+
+    def _serve(self):
+        """Start the site on a free local port, in a thread of this process.
+
+        It runs the ASGI application under Uvicorn, as the Procfile's workers
+        do. Returns a function that stops the server, and its host and port.
+        """
+        if '127.0.0.1' not in settings.ALLOWED_HOSTS and '*' not in settings.ALLOWED_HOSTS:
+            # Only this process's copy, for the server it is about to start.
+            settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, '127.0.0.1']
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        # No log_config, which would replace the site's logging settings.
+        server = uvicorn.Server(uvicorn.Config(get_asgi_application(), lifespan='off',
+                                               log_config=None, access_log=False))
+        thread = threading.Thread(target=server.run, kwargs={'sockets': [sock]}, daemon=True)
+        thread.start()
+        while not server.started:
+            if not thread.is_alive():
+                sock.close()
+                raise CommandError("The server did not start.")
+            time.sleep(0.01)
+
+        def stop():
+            server.should_exit = True
+            thread.join()
+            sock.close()
+        return stop, '127.0.0.1', sock.getsockname()[1]
+
+    def _run(self, host, port, paths, concurrency):
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(lambda pair: (pair[0], *fetch(host, port, pair[1])), paths))
+
+    def _print(self, report):
+        self.stdout.write(f"{report['requests']} requests in {report['seconds']} s: "
+                          f"{report['throughput']} req/s, {report['error_rate']:.1%} errors")
+        self.stdout.write(f"{'route':<18}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+                          f"{'p99 ms':>9}{'errors':>8}")
+        for route, row in report['routes'].items():
+            self.stdout.write(f"{route:<18}{row['requests']:>9}{row['throughput']:>9}"
+                              f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}"
+                              f"{row['error_rate']:>8.1%}")
+            for status, count in row['error_statuses'].items():
+                self.stdout.write(f"{'':<18}{count} × {status}")
+
+
+def fetch(host, port, path):
+    """(seconds, status) for one GET; redirects count as served, not followed."""
+    start = time.perf_counter()
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        connection.request('GET', path, headers={'Accept-Encoding': 'gzip, br'})
+        response = connection.getresponse()
+        response.read()
+        status = response.status
+    except (OSError, http.client.HTTPException) as e:
+        status = type(e).__name__
+    finally:
+        connection.close()
+    return time.perf_counter() - start, status
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def summarise(results, elapsed):
+    """Per-route and overall figures from (route, seconds, status) triples."""
+    def figures(rows):
+        latencies = sorted(seconds for _, seconds, _ in rows)
+        failed = [str(status) for _, _, status in rows
+                  if not isinstance(status, int) or status >= 400]
+        return {
+            'requests': len(rows),
+            'throughput': round(len(rows) / elapsed, 1) if elapsed else 0,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+            'error_rate': round(len(failed) / len(rows), 4) if rows else 0,
+            'error_statuses': {status: failed.count(status) for status in sorted(set(failed))},
+        }
+
+    routes = {}
+    for row in results:
+        routes.setdefault(row[0], []).append(row)
+    overall = figures(results)
+    return {
+        'requests': overall['requests'],
+        'seconds': round(elapsed, 2),
+        'throughput': overall['throughput'],
+        'error_rate': overall['error_rate'],
+        'overall': overall,
+        'routes': {route: figures(rows) for route, rows in sorted(routes.items())},
+    }
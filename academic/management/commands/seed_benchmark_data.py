@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from academic import benchmarks
+
+
+class Command(BaseCommand):
+    help = ('Writes deterministic synthetic references, talks, grants, students, reviews '
+            'and service, for seeing how the site and the CV behave at scale.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('size', type=int, nargs='?', default=1000,
+                            help='References and talks to write; the rest scale with it (default 1000).')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed. The same seed and size write the same rows.')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete the rows of any earlier run first.')
+        parser.add_argument('--force', action='store_true',
+                            help='Write even with DEBUG off, i.e. most likely into production.')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("DEBUG is off, so this may be the live database. "
+                               "Use a scratch database, or pass --force.")
+        with transaction.atomic():
+            if options['clear']:
+                benchmarks.clear()
+            counts = benchmarks.seed(options['size'], seed=options['seed'])
+        self.stdout.write(self.style.SUCCESS(
+            "Wrote " + ", ".join(f"{count} {name.replace('_', ' ')}" for name, count in counts.items())
+            + ". Remove them with --clear, or by deleting the bench- rows."))
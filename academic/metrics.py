@@ -0,0 +1,250 @@
+"""Per-view request metrics, as ``Server-Timing`` headers and for Prometheus.
+
+``MetricsMiddleware`` records, for each resolved view name, how many requests
+it served, a latency histogram, how many SQL queries they made and how long
+those took, and how many bytes went out. Each response also reports its own
+SQL and total time in ``Server-Timing``, which browser dev tools display.
+
+Each thread accumulates into a shard of its own, so recording takes no lock;
+shards are only read, and summed, when metrics are asked for. Each worker
+process publishes its sum to the cache every ``PUBLISH_INTERVAL`` seconds, and
+``/metrics/`` adds up every worker that has published recently, so a scrape
+that lands on one worker still sees all of them when the cache is shared
+(Redis in production). Restarted workers start from zero, which Prometheus
+treats as a counter reset.
+
+``/metrics/`` is open to staff, and to ``Authorization: Bearer <METRICS_TOKEN>``
+for a scraper when that setting is present.
+"""
+
+import contextlib
+import logging
+import os
+import socket
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+PUBLISH_INTERVAL = 15
+# A worker that has not published for this long is assumed gone.
+PUBLISH_TTL = 300
+
+WORKERS_KEY = 'academic:metrics:workers'
+WORKER_ID = f'{socket.gethostname()}:{os.getpid()}'
+
+# Fields of a view's stats: requests, latency sum, SQL queries, SQL seconds,
+# response bytes, then one count per bucket and one for +Inf.
+REQUESTS, SECONDS, QUERIES, SQL_SECONDS, BYTES, FIRST_BUCKET = range(6)
+WIDTH = FIRST_BUCKET + len(BUCKETS) + 1
+
+_local = threading.local()
+_shards = []  # every thread's {view: stats}; list.append is atomic
+_last_published = 0.0
+
+
+def _shard():
+    try:
+        return _local.shard
+    except AttributeError:
+        _local.shard = {}
+        _shards.append(_local.shard)
+        return _local.shard
+
+
+def record(view, seconds, queries, sql_seconds, size):
+    """Add one request to this thread's shard."""
+    stats = _shard().get(view)
+    if stats is None:
+        stats = _shard()[view] = [0] * WIDTH
+    stats[REQUESTS] += 1
+    stats[SECONDS] += seconds
+    stats[QUERIES] += queries
+    stats[SQL_SECONDS] += sql_seconds
+    stats[BYTES] += size
+    bucket = next((i for i, bound in enumerate(BUCKETS) if seconds <= bound), len(BUCKETS))
+    stats[FIRST_BUCKET + bucket] += 1
+
+
+def _add(total, stats):
+    for view, values in stats.items():
+        into = total.setdefault(view, [0] * WIDTH)
+        for i, value in enumerate(values):
+            into[i] += value
+    return total
+
+
+def snapshot():
+    """This process's stats, summed over its threads."""
+    total = {}
+    for shard in list(_shards):
+        # A copy, since the owning thread may add a view meanwhile.
+        _add(total, {view: list(values) for view, values in list(shard.items())})
+    return total
+
+
+def reset():
+    """Forget everything this process has recorded."""
+    for shard in list(_shards):
+        shard.clear()
+
+
+def publish(force=False):
+    """Put this process's snapshot in the cache, at most every PUBLISH_INTERVAL."""
+    global _last_published
+    now = time.monotonic()
+    if not force and now - _last_published < PUBLISH_INTERVAL:
+        return
+    _last_published = now
+    cache.set(f'{WORKERS_KEY}:{WORKER_ID}', snapshot(), PUBLISH_TTL)
+    workers = cache.get(WORKERS_KEY) or []
+    if WORKER_ID not in workers:
+        # Two workers registering at once can lose one; it re-registers on its
+        # next publish.
+        cache.set(WORKERS_KEY, workers + [WORKER_ID], None)
+
+
+def collect():
+    """Every live worker's stats added together, this one's up to the moment."""
+    publish(force=True)
+    workers = cache.get(WORKERS_KEY) or []
+    published = cache.get_many([f'{WORKERS_KEY}:{worker}' for worker in workers])
+    live = [worker for worker in workers if f'{WORKERS_KEY}:{worker}' in published]
+    if live != workers:
+        cache.set(WORKERS_KEY, live, None)
+    total = {}
+    for stats in published.values():
+        _add(total, stats)
+    return total
+
+
+def exposition(stats):
+    """``stats`` in the Prometheus text format."""
+    families = [
+        ('academic_requests_total', 'counter', 'Requests served.', REQUESTS),
+        ('academic_db_queries_total', 'counter', 'SQL queries made.', QUERIES),
+        ('academic_db_duration_seconds_total', 'counter', 'Time spent in SQL.', SQL_SECONDS),
+        ('academic_response_bytes_total', 'counter', 'Response body bytes.', BYTES),
+    ]
+    views = sorted(stats)
+    lines = []
+    for name, kind, help_text, index in families:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        lines += [f'{name}{{view="{_label(view)}"}} {_number(stats[view][index])}' for view in views]
+
+    name = 'academic_request_duration_seconds'
+    lines += [f'# HELP {name} Time to respond, by view.', f'# TYPE {name} histogram']
+    for view in views:
+        values, label = stats[view], _label(view)
+        cumulative = 0
+        for i, bound in enumerate(BUCKETS + ('+Inf',)):
+            cumulative += values[FIRST_BUCKET + i]
+            lines.append(f'{name}_bucket{{view="{label}",le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{view="{label}"}} {_number(values[SECONDS])}')
+        lines.append(f'{name}_count{{view="{label}"}} {values[REQUESTS]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+class _SQLTimer:
+    """An execute wrapper that counts queries and adds up their time."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+def _timing(timer):
+    """``timer`` wrapped around every connection of the calling thread."""
+    stack = contextlib.ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(timer))
+    return stack
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = _SQLTimer()
+        start = time.perf_counter()
+        with _timing(timer):
+            response = self.get_response(request)
+        return self._finish(request, response, timer, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        timer = _SQLTimer()
+        start = time.perf_counter()
+        # Connections are per thread. Under ASGI the request's queries run on
+        # its thread-sensitive thread, not this one, so the timer goes on the
+        # connections there, and comes off them there too.
+        timing = await sync_to_async(_timing)(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(timing.close)()
+        return self._finish(request, response, timer, time.perf_counter() - start)
+
+    def _finish(self, request, response, timer, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        size = 0 if response.streaming else len(response.content)
+        record(view, elapsed, timer.queries, timer.seconds, size)
+        try:
+            publish()
+        except Exception:
+            # Metrics must never take a page down with the cache.
+            logger.warning("Could not publish request metrics", exc_info=True)
+
+        timing = 'db;dur=%.1f;desc="%d queries", total;dur=%.1f' % (
+            timer.seconds * 1000, timer.queries, elapsed * 1000)
+        if response.has_header('Server-Timing'):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response['Server-Timing'] = timing
+        return response
+
+
+def metrics_view(request):
+    """Every worker's stats in the Prometheus text format. Staff or token only."""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    header = request.headers.get('Authorization', '')
+    authorised = (request.user.is_active and request.user.is_staff) or (
+        token and constant_time_compare(header, f'Bearer {token}'))
+    if not authorised:
+        return HttpResponseForbidden()
+    response = HttpResponse(exposition(collect()), content_type='text/plain; version=0.0.4')
+    response['Cache-Control'] = 'no-store'
+    return response
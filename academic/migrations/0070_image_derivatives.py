@@ -0,0 +1,73 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("academic", "0069_profile_mastodon"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="collaborator",
+            name="headshot_derivatives",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Resized WebP and JPEG copies of the image, generated automatically.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="figure",
+            name="image_derivatives",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Resized WebP and JPEG copies of the image, generated automatically.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="grant",
+            name="image_derivatives",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Resized WebP and JPEG copies of the image, generated automatically.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="grant",
+            name="sponsor_logo_derivatives",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Resized WebP and JPEG copies of the image, generated automatically.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="headshot_derivatives",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Resized WebP and JPEG copies of the image, generated automatically.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reference",
+            name="reference_image_derivatives",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Resized WebP and JPEG copies of the image, generated automatically.",
+            ),
+        ),
+    ]
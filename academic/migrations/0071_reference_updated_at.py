@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("academic", "0070_image_derivatives"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reference",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,240 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:37
+
+import academic.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("academic", "0071_reference_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="award",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="collaborator",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="deliveredproduct",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="education",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="experience",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="figure",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="grant",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="innovation",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="domain",
+            field=models.CharField(
+                blank=True,
+                help_text="Host name this profile's site is served on, e.g. hansriess.com; www. in front of it matches too. Requests for any other host get the default profile, the first one created.",
+                max_length=253,
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="proposal",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="quote",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reference",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="referenceperson",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="review",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="service",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="student",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="talk",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The site this belongs to. Leave blank for the default site, the first profile created.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="academic.profile",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="profile",
+            name="cv",
+            field=models.FileField(
+                blank=True,
+                help_text="The generated CV. Overwritten every time the CV is rebuilt.",
+                null=True,
+                upload_to=academic.models._profile_upload_to,
+            ),
+        ),
+    ]
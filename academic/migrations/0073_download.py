@@ -0,0 +1,57 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("academic", "0072_profile_domain_owners"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Download",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("paper", "Paper"),
+                            ("slides", "Slides"),
+                            ("poster", "Poster"),
+                            ("cv", "CV"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "slug",
+                    models.CharField(
+                        help_text="The paper's or talk's slug; for the CV, the profile's id.",
+                        max_length=300,
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("count", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["-day", "kind", "slug"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="download",
+            constraint=models.UniqueConstraint(
+                fields=("kind", "slug", "day"), name="unique_download_per_day"
+            ),
+        ),
+    ]
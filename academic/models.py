@@ -1,4 +1,10 @@
+import functools
+import time
+import uuid
+
+from django.core.cache import cache
 from django.db import models
+from django.http.request import split_domain_port
 
 
 # Subsections of Section I.B ("Publications, Presentations, Posters") of the CV.
@@ -20,14 +26,52 @@ CREDIT_HELP = (
     "and editing'. Rendered as 'Contributed ....'"
 )
 
+# Filled in by academic.images whenever the image beside it changes.
+DERIVATIVES_HELP = "Resized WebP and JPEG copies of the image, generated automatically."
+
 CV_REF_HELP = (
     "Cross-reference handle. Write [[ref:this-slug]] in any CV prose field to "
     "produce a live reference such as I.B.3.4."
 )
 
+# Profile.current() and Profile.for_host() keep the profiles in each process,
+# and this cache key holds a token that changes whenever any profile is saved or
+# deleted. Every process compares tokens at most every PROFILE_CHECK_INTERVAL
+# seconds, so with a shared cache backend an edit reaches all workers within a
+# second, without a cache round trip per call; with a per-process one, within
+# PROFILE_MAX_AGE seconds. A save in this process is seen at once.
+PROFILE_VERSION_KEY = 'academic:profile-version'
+PROFILE_CHECK_INTERVAL = 1
+PROFILE_MAX_AGE = 60
+
+# Replaced whole, never mutated, so that a thread reading it while another
+# reloads or invalidates it sees one consistent copy.
+_current_profile = {}
+
+OWNER_HELP = ("The site this belongs to. Leave blank for the default site, the "
+              "first profile created.")
+
+
+@functools.lru_cache(maxsize=32)
+def _name_parts(name):
+    parts = [p for p in name.replace(',', ' ').split() if p]
+    trimmed = [p for p in parts if p.lower() not in Profile.NAME_SUFFIXES]
+    return tuple(trimmed or parts)
+
+
+def _profile_upload_to(instance, filename):
+    # One folder per site, so that every site's generated cv.pdf keeps its own name.
+    return f'profile/{instance.pk}/{filename}'
+
 
 class Profile(models.Model):
     name = models.CharField(max_length=100)
+    domain = models.CharField(
+        max_length=253, unique=True, blank=True, null=True,
+        help_text="Host name this profile's site is served on, e.g. hansriess.com; "
+                  "www. in front of it matches too. Requests for any other host get "
+                  "the default profile, the first one created.",
+    )
     occupation = models.CharField(max_length=200, blank=True, null=True)
     title = models.CharField(max_length=200, blank=True, null=True)
     long_title = models.CharField(max_length=200, blank=True, null=True)
@@ -48,7 +92,7 @@ class Profile(models.Model):
     country = models.CharField(max_length=200, blank=True, null=True)
     phone = models.CharField(max_length=20, blank=True, null=True)
     cv = models.FileField(
-        upload_to='profile/', blank=True, null=True,
+        upload_to=_profile_upload_to, blank=True, null=True,
         help_text="The generated CV. Overwritten every time the CV is rebuilt.",
     )
     custom_cv = models.FileField(
@@ -69,6 +113,7 @@ class Profile(models.Model):
         help_text="Show the publications list on the home page.",
     )
     headshot = models.ImageField(upload_to='profile/', blank=True, null=True)
+    headshot_derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text=DERIVATIVES_HELP)
     website = models.URLField(blank=True, null=True)
     twitter = models.URLField(blank=True, null=True)
     blue_sky = models.URLField(blank=True, null=True)
@@ -109,11 +154,76 @@ class Profile(models.Model):
     NAME_SUFFIXES = {'ph.d.', 'ph.d', 'phd', 'm.d.', 'md', 'd.sc.', 'sc.d.',
                      'jr.', 'jr', 'sr.', 'sr', 'ii', 'iii', 'iv', 'esq.'}
 
+    @classmethod
+    def current(cls):
+        """The default site's profile, or None: the first by pk, cached per process.
+
+        Use this rather than ``Profile.objects.first()``; the row changes a few
+        times a year and is wanted on nearly every request. A request's own
+        profile is ``request.profile``, which depends on the host.
+        """
+        return cls._held()['profile']
+
+    @classmethod
+    def for_host(cls, host):
+        """The profile whose ``domain`` is ``host`` (port and www. ignored),
+        else the default one. Cached with ``current()``."""
+        name = split_domain_port(host)[0].lower()
+        domains = cls._held()['domains']
+        return domains.get(name) or domains.get(name.removeprefix('www.')) or cls.current()
+
+    @classmethod
+    def _held(cls):
+        """Every profile, as loaded by this process for the current token."""
+        global _current_profile
+        # Read once: other threads replace the dict, never change it.
+        held = _current_profile
+        now = time.monotonic()
+        if held and now - held['checked'] < PROFILE_CHECK_INTERVAL:
+            return held
+        version = cache.get(PROFILE_VERSION_KEY)
+        if version is None:
+            cache.add(PROFILE_VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(PROFILE_VERSION_KEY)
+        if held.get('version') == version and now - held['loaded'] <= PROFILE_MAX_AGE:
+            held = _current_profile = {**held, 'checked': now}
+        else:
+            # One query for every site: there are a few dozen at most.
+            profiles = list(cls.objects.order_by('pk'))
+            for profile in profiles:
+                profile._is_default_site = profile is profiles[0]
+            held = {
+                'version': version, 'loaded': now, 'checked': now,
+                'profile': profiles[0] if profiles else None,
+                'domains': {profile.domain.lower(): profile
+                            for profile in profiles if profile.domain},
+            }
+            _current_profile = held
+        return held
+
+    @classmethod
+    def invalidate_current(cls):
+        """Make every process re-read the profiles; connected to save and delete."""
+        global _current_profile
+        _current_profile = {}
+        cache.set(PROFILE_VERSION_KEY, uuid.uuid4().hex, None)
+
+    _is_default_site = None
+
+    def is_default_site(self):
+        """Whether this is the default site's profile, which owns every unowned row.
+
+        Known without a query for a profile from ``current()`` or
+        ``for_host()``, so that async views can filter by it.
+        """
+        if self._is_default_site is None:
+            default = Profile.current()
+            self._is_default_site = bool(default) and default.pk == self.pk
+        return self._is_default_site
+
     def name_parts(self):
         """The name split into words, with post-nominal suffixes removed."""
-        parts = [p for p in self.name.replace(',', ' ').split() if p]
-        trimmed = [p for p in parts if p.lower() not in self.NAME_SUFFIXES]
-        return trimmed or parts
+        return list(_name_parts(self.name))
 
     def plain_name(self):
         """The name without post-nominals, e.g. 'Hans Riess'."""
@@ -124,7 +234,7 @@ class Profile(models.Model):
         parts = self.name_parts()
         return parts[-1] if parts else ""
 
-    @property
+    @functools.cached_property
     def display_website(self):
         """
         Returns the website URL for display, stripped of the 'https://' or 'http://' prefix.
@@ -158,7 +268,34 @@ class Profile(models.Model):
     def __str__(self):
         return self.name
 
-class Quote(models.Model):
+class OwnedQuerySet(models.QuerySet):
+    def owned_by(self, profile):
+        """The rows of ``profile``'s site.
+
+        Rows with no owner belong to the default site, so a single-site
+        database needs no owners filled in at all. With no profile, only those
+        rows are returned.
+        """
+        if not profile:
+            return self.filter(owner__isnull=True)
+        if profile.is_default_site():
+            return self.filter(models.Q(owner=profile) | models.Q(owner__isnull=True))
+        return self.filter(owner=profile)
+
+
+class Owned(models.Model):
+    """Content belonging to one profile's site. Rows hanging off an owned row
+    (a grant's milestones and reports) belong to that row's site."""
+    owner = models.ForeignKey(Profile, on_delete=models.PROTECT, blank=True, null=True,
+                              related_name='+', help_text=OWNER_HELP)
+
+    objects = OwnedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+
+class Quote(Owned):
     author = models.CharField(max_length=200, blank=True, null=True, help_text="Author of the quote")
     quote = models.TextField(max_length=2000, blank=True, null=True, help_text="A stylized quote to display in the footer")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -167,28 +304,36 @@ class Quote(models.Model):
     def __str__(self):
         return f"{self.author}"
 
-class Collaborator(models.Model):
+class Collaborator(Owned):
     name = models.CharField(max_length=100)
     email = models.EmailField(blank=True, null=True)
     website = models.URLField(blank=True, null=True)
     institution = models.CharField(max_length=200, blank=True, null=True)
     location = models.CharField(max_length=200, blank=True, null=True)
     headshot = models.ImageField(upload_to='collaborators/', blank=True, null=True)
+    headshot_derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text=DERIVATIVES_HELP)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
 
-class Figure(models.Model):
+class Figure(Owned):
     name = models.CharField (max_length=100)
     image = models.ImageField(upload_to='figures/', blank=True, null=True)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text=DERIVATIVES_HELP)
     caption = models.TextField(blank=True)
 
     def __str__(self):
         return self.name
 
-class Reference(models.Model):
+# The columns a list of publications (a landing page section, a project page)
+# prints, for .only(); the abstract and the rest stay in the database.
+REFERENCE_LIST_FIELDS = ('title', 'authors', 'year', 'journal', 'volume', 'issue', 'pages',
+                         'url', 'code')
+
+
+class Reference(Owned):
     """Database of papers and books"""
     MEDIUM_CHOICES = [
         ('journal_article', 'Journal Article'),
@@ -230,12 +375,14 @@ class Reference(models.Model):
     pdf_file = models.FileField(upload_to='references/papers/', blank=True)
     slug = models.SlugField(max_length=300, unique=True, blank=True, null=True, help_text="Short URL slug for sharing")
     reference_image = models.ImageField(upload_to='references/images/', blank=True, null=True, help_text="Optional image for the publication (e.g., graph, diagram)")
+    reference_image_derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text=DERIVATIVES_HELP)
     abstract = models.TextField(blank=True)
     keywords = models.CharField(max_length=500, blank=True, help_text="Comma-separated list of keywords")
     code = models.URLField(blank=True, help_text="Link to the code repository")
     credit_roles = models.CharField(max_length=500, blank=True, help_text=CREDIT_HELP)
     arxiv_id = models.CharField(max_length=50, blank=True, help_text="arXiv identifier, e.g. 2501.03890")
     cv_ref_slug = models.SlugField(max_length=100, blank=True, null=True, unique=True, help_text=CV_REF_HELP)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-year', 'title']
@@ -316,7 +463,7 @@ class Reference(models.Model):
     def __str__(self):
         return f"{self.title} ({self.year})"
 
-class Course(models.Model):
+class Course(Owned):
     """Model for tracking teaching experiences"""
     SEMESTER_CHOICES = [
         ('spring', 'Spring'),
@@ -418,7 +565,7 @@ class Course(models.Model):
         return self.curriculum_role or self.get_role_display()
 
 
-class Experience(models.Model):
+class Experience(Owned):
     """Model for tracking academic and industry positions"""
     JOB_TYPE_CHOICES = [
         ('academic', 'Academic'),
@@ -497,7 +644,7 @@ class Experience(models.Model):
         """Returns a more readable job type name"""
         return self.get_job_type_display()
     
-class Talk(models.Model):
+class Talk(Owned):
     """Model for tracking presentations, seminars, and speaking engagements"""
     TALK_TYPE_CHOICES = [
         ('conference', 'Conference Presentation'),
@@ -613,7 +760,7 @@ class Talk(models.Model):
 
         return " ".join(words[:3])
     
-class Grant(models.Model):
+class Grant(Owned):
     """Minimal model for research funding, grants, and awards (CV style)"""
 
     ROLE_CHOICES = [
@@ -630,9 +777,11 @@ class Grant(models.Model):
     slug = models.SlugField(max_length=300, unique=True, blank=True, null=True, help_text="URL-friendly version of the title")
     description = models.TextField(blank=True, help_text="A description of the grant or project")
     image = models.ImageField(upload_to='grants/', blank=True, null=True, help_text="Image for the grant")
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text=DERIVATIVES_HELP)
     funding_agency = models.CharField(max_length=200, help_text="Funding agency or organization")
     program_manager = models.CharField(max_length=200, blank=True, null=True, help_text="Program manager at the funding agency")
     sponsor_logo = models.ImageField(upload_to='grants/sponsor_logos/', blank=True, null=True, help_text="Logo of the sponsoring organization")
+    sponsor_logo_derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text=DERIVATIVES_HELP)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='pi')
     amount = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True, help_text="Total grant amount")
     currency = models.CharField(max_length=3, default='USD', help_text="Currency code (USD, EUR, etc.)")
@@ -733,7 +882,7 @@ class Milestone(models.Model):
         return f"{self.title} ({self.grant.title})"
 
 
-class Education(models.Model):
+class Education(Owned):
     """Minimal model for academic degrees (CV style)"""
     degree_type = models.CharField(max_length=20, help_text="Type of degree")
     degree_type_short = models.CharField(max_length=20, blank=True, null=True, help_text="Short form of degree type")
@@ -778,7 +927,7 @@ class Education(models.Model):
         return f"{degree} in {self.field_of_study}, {self.institution}{location_str} ({self.graduation_year}){gpa_str}{thesis_str}{advisor_str}{honors_str}"
 
 
-class Service(models.Model):
+class Service(Owned):
     """Minimal model for professional service activities (CV style)"""
     SERVICE_TYPE_CHOICES = [
         ('conference', 'Conference'),
@@ -849,7 +998,7 @@ class Service(models.Model):
             return 'civic'
         return 'special_activity'
 
-class Review(models.Model):
+class Review(Owned):
     """Peer review and editorial work.
 
     Sections V.A and V.B of the CV. Kept apart from Service because a review is
@@ -920,7 +1069,7 @@ class Review(models.Model):
         return str(self.year)
 
 
-class Student(models.Model):
+class Student(Owned):
     """Model for tracking student mentorship"""
     LEVEL_CHOICES = [
         ('undergrad', 'Undergraduate'),
@@ -993,7 +1142,7 @@ class Student(models.Model):
         else:
             return "" # Should not happen if start_date is required
 
-class Award(models.Model):
+class Award(Owned):
     """Section I.D of the CV: professional research recognition awards."""
     title = models.CharField(max_length=300, help_text="Name of the award, fellowship, or nomination")
     organization = models.CharField(max_length=300, blank=True, help_text="Awarding body, conference, or institution")
@@ -1020,7 +1169,7 @@ class Award(models.Model):
         return self.date_range or (str(self.year) if self.year else "")
 
 
-class DeliveredProduct(models.Model):
+class DeliveredProduct(Owned):
     """Section I.C of the CV: key delivered products."""
     name = models.CharField(max_length=200, help_text="Short name of the product, e.g. 'Lawvere'")
     summary = models.CharField(
@@ -1054,7 +1203,7 @@ class DeliveredProduct(models.Model):
         return f"{self.name} — {self.summary}" if self.summary else self.name
 
 
-class Proposal(models.Model):
+class Proposal(Owned):
     """Section IV.B of the CV: research proposals to sponsors."""
     RESULT_CHOICES = [
         ('pending', 'Pending'),
@@ -1168,7 +1317,7 @@ class TechReport(models.Model):
         return f"{self.title} ({self.grant.short_title or self.grant.title})"
 
 
-class Innovation(models.Model):
+class Innovation(Owned):
     """Section II.B: significant technical innovation on sponsored programs."""
     title = models.CharField(max_length=500, help_text="Title of the innovation or contribution")
     grants = models.ManyToManyField(
@@ -1209,7 +1358,7 @@ class Innovation(models.Model):
         return "; ".join(parts)
 
 
-class ReferencePerson(models.Model):
+class ReferencePerson(Owned):
     """Model for professional references (distinct from Publication References)"""
     RELATIONSHIP_CHOICES = [
         ('advisor', 'Ph.D. Advisor'),
@@ -1233,4 +1382,29 @@ class ReferencePerson(models.Model):
         verbose_name_plural = "Professional References"
     
     def __str__(self):
-        return f"{self.name}"
\ No newline at end of file
+        return f"{self.name}"
+
+class Download(models.Model):
+    """Hits on the paper, slide, poster and CV redirects, one row per file per day.
+
+    Written in batches by academic.analytics, never per request.
+    """
+    KIND_CHOICES = [
+        ('paper', 'Paper'),
+        ('slides', 'Slides'),
+        ('poster', 'Poster'),
+        ('cv', 'CV'),
+    ]
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    slug = models.CharField(max_length=300, help_text="The paper's or talk's slug; for the CV, the profile's id.")
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-day', 'kind', 'slug']
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'slug', 'day'], name='unique_download_per_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.slug} on {self.day}: {self.count}"
@@ -0,0 +1,162 @@
+"""Catch the same query running over and over within one request or command.
+
+A template or builder that touches a relation once per row (``tech_reports``
+per grant, ``resulting_publications`` per student) runs one statement per row
+that differs only in its parameters. ``watch`` fingerprints each SELECT with
+its literals blanked out and, once any fingerprint has run more than
+``threshold`` times, reports it with the Python stack of the call site, which
+is where a ``select_related`` or ``prefetch_related`` is missing.
+
+Reports are warnings under ``DEBUG`` and errors in the test suite. The
+``REPEATED_QUERIES`` setting overrides that: ``'warn'``, ``'raise'``, or
+``None`` to switch it off. ``REPEATED_QUERY_THRESHOLD`` defaults to 10.
+"""
+
+import contextlib
+import os
+import re
+import traceback
+import warnings
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.test.utils import override_settings
+
+DEFAULT_THRESHOLD = 10
+
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+class RepeatedQueryWarning(UserWarning):
+    pass
+
+
+class RepeatedQueryError(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """``sql`` with its literals and the length of any IN list blanked out."""
+    return _LITERAL.sub('?', _IN_LIST.sub('(...)', sql))
+
+
+def mode():
+    """'warn', 'raise' or None, from the settings."""
+    if hasattr(settings, 'REPEATED_QUERIES'):
+        return settings.REPEATED_QUERIES
+    return 'warn' if settings.DEBUG else None
+
+
+def threshold():
+    return getattr(settings, 'REPEATED_QUERY_THRESHOLD', DEFAULT_THRESHOLD)
+
+
+def _call_site():
+    """The stack as far as this project's own code goes, innermost last."""
+    root = str(settings.BASE_DIR)
+    frames = [frame for frame in traceback.extract_stack()[:-3]
+              if frame.filename.startswith(root) and 'site-packages' not in frame.filename
+              and os.path.basename(frame.filename) != 'repeated_queries.py']
+    return ''.join(traceback.format_list(frames[-8:]))
+
+
+class Watcher:
+    """An execute wrapper that counts SELECTs by fingerprint."""
+
+    def __init__(self, label, strict=False, limit=None):
+        self.label = label
+        self.strict = strict
+        self.limit = threshold() if limit is None else limit
+        self.counts = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip()[:6].upper() == 'SELECT':
+            shape = fingerprint(sql)
+            count = self.counts[shape] = self.counts.get(shape, 0) + 1
+            if count == self.limit + 1:
+                self.report(shape)
+        return execute(sql, params, many, context)
+
+    def report(self, shape):
+        message = ("%s ran the same query more than %d times; it is probably once per row:\n"
+                   "    %s\nat\n%s" % (self.label, self.limit, shape, _call_site()))
+        if self.strict:
+            raise RepeatedQueryError(message)
+        warnings.warn(message, RepeatedQueryWarning)
+
+
+@contextlib.contextmanager
+def watch(label, strict=None, limit=None):
+    """Watch every database connection for the duration of the block.
+
+    ``strict`` raises rather than warns; by default it follows the settings,
+    and the block is not watched at all when they turn the check off.
+    """
+    current = mode()
+    if strict is None and not current:
+        yield None
+        return
+    watcher = Watcher(label, strict=current == 'raise' if strict is None else strict,
+                      limit=limit)
+    with contextlib.ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(watcher))
+        yield watcher
+
+
+class RepeatedQueryMiddleware:
+    """Watches each request. Only installed under DEBUG or REPEATED_QUERIES."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not mode():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with watch(f'{request.method} {request.path}'):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        # As in MetricsMiddleware: the watcher goes on, and comes off, the
+        # connections of the thread the request's queries run on.
+        watching = watch(f'{request.method} {request.path}')
+        await sync_to_async(watching.__enter__)()
+        try:
+            return await self.get_response(request)
+        finally:
+            await sync_to_async(watching.__exit__)(None, None, None)
+
+
+class WatchedCommandMixin:
+    """For management commands: watches the whole run."""
+
+    def execute(self, *args, **options):
+        with watch(f"manage.py {self.__module__.rsplit('.', 1)[-1]}"):
+            return super().execute(*args, **options)
+
+
+class RepeatedQueryTestMixin:
+    """Fails a test whose requests repeat a query, and offers the same check
+    for code called directly via ``assertNoRepeatedQueries``."""
+
+    def _pre_setup(self):
+        super()._pre_setup()
+        self._repeated_queries = override_settings(REPEATED_QUERIES='raise')
+        self._repeated_queries.enable()
+
+    def _post_teardown(self):
+        self._repeated_queries.disable()
+        super()._post_teardown()
+
+    def assertNoRepeatedQueries(self, limit=None):
+        return watch(self.id(), strict=True, limit=limit)
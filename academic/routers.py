@@ -0,0 +1,83 @@
+"""Send the public pages' reads to a read replica, when there is one.
+
+With ``DATABASE_REPLICA_URL`` set, the settings add a ``replica`` database
+and install ``ReplicaRouter``. Reads of this app's models go to the replica
+inside ``replica_reads()``, which the public views (by way of
+``@reads_from_replica``) and the CV builder enter; everything else, the admin,
+sessions and every write included, stays on the primary.
+
+The first write inside a block makes the rest of it read from the primary
+too, so that a request never misses its own write on a replica that lags
+behind: ``/cv/`` rebuilding the CV and then reading the profile back, say.
+"""
+
+import contextlib
+import contextvars
+import functools
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA = 'replica'
+
+# None outside replica_reads(); inside, whether the block has written yet.
+# A dict, so that a write in a thread started by sync_to_async, which gets a
+# copy of the context, is still seen by the block that started it.
+_state = contextvars.ContextVar('academic_replica_reads', default=None)
+
+
+@contextlib.contextmanager
+def replica_reads():
+    """Read this app's models from the replica until the first write."""
+    if _state.get() is not None:
+        yield
+        return
+    token = _state.set({'wrote': False})
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+def reading_from_replica():
+    """Whether a read here would go to the replica, if there is one."""
+    state = _state.get()
+    return state is not None and not state['wrote']
+
+
+def reads_from_replica(view):
+    """Run a view, sync or async, inside ``replica_reads()``."""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            with replica_reads():
+                return await view(*args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with replica_reads():
+                return view(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (model._meta.app_label == 'academic' and reading_from_replica()
+                and REPLICA in settings.DATABASES):
+            return REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state['wrote'] = True
+        # Explicitly, or a row read from the replica would be saved back to it.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so rows from either relate.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
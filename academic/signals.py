@@ -0,0 +1,39 @@
+"""Model signal handlers, connected in ``AcademicConfig.ready``."""
+
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+
+from . import images
+from .models import Profile
+
+
+def refresh_image_derivatives(sender, instance, raw=False, **kwargs):
+    """Regenerate resized copies of any image field whose file has changed."""
+    # raw is set while loading fixtures, whose files may not exist at all.
+    if raw:
+        return
+    for field_name in images.image_fields(sender):
+        images.refresh(instance, field_name)
+
+
+# What generate_cv saves after rebuilding a CV under the name it already had.
+CV_ONLY = frozenset({'cv', 'updated_at'})
+
+
+def invalidate_profile(sender, update_fields=None, **kwargs):
+    """Drop the profile cached by ``Profile.current()``, in every process.
+
+    Not for a rebuilt CV, which every /cv/ request saves: the cached copies
+    still name the right file.
+    """
+    if update_fields == CV_ONLY:
+        return
+    Profile.invalidate_current()
+
+
+def connect():
+    for label in {label for label, _ in images.IMAGE_FIELDS}:
+        post_save.connect(refresh_image_derivatives, sender=apps.get_model(label),
+                          dispatch_uid=f'image_derivatives:{label}')
+    for signal in (post_save, post_delete):
+        signal.connect(invalidate_profile, sender=Profile, dispatch_uid='invalidate_profile')
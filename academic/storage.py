@@ -0,0 +1,293 @@
+"""Static file storage for production.
+
+Static files are served straight from S3. ``S3Boto3Storage`` uploads them under
+their own names, so an edited file is shadowed by the copy already in every
+browser's cache until its ``max-age`` runs out. ``ManifestS3Storage`` adds
+Django's ``ManifestFilesMixin``: ``collectstatic`` uploads each file under a
+name carrying a hash of its content, rewrites ``url()`` references in CSS to
+match, and records the mapping in ``staticfiles.json``, which ``{% static %}``
+reads. A hashed name never changes content, so it is served ``immutable`` with
+a one-year ``max-age`` and browsers never need to revalidate it. The bundles in
+``academic/bundles.py`` are built in the same step.
+
+S3 serves objects exactly as stored and never compresses them itself, so
+CSS, JavaScript and SVG are stored gzip-encoded, which every browser accepts,
+with a Brotli copy beside each hashed one for browsers that accept that.
+
+It also uploads only what changed since the last deploy. A second manifest,
+``staticfiles.sync.json``, records the SHA-256 of every file as of the last
+successful ``collectstatic``; files whose content matches are skipped, and the
+rest are uploaded in parallel.
+"""
+
+import hashlib
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import brotli
+from django.contrib.staticfiles.storage import ManifestFilesMixin
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage
+from storages.backends.s3 import S3Storage
+
+from academic import bundles
+
+logger = logging.getLogger(__name__)
+
+# Hashed files never change, so they may be cached for as long as browsers allow.
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# The manifest keeps its name from deploy to deploy, so it must never be cached.
+NO_CACHE = 'no-cache'
+
+# The 12 hex digits ``HashedFilesMixin.file_hash`` puts before the extension.
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}(\.[^./]+)*$')
+
+# Text formats worth compressing; everything else in static/ is already compressed.
+COMPRESSIBLE = ('.css', '.js', '.svg')
+
+
+def has_brotli_copy(name):
+    """Whether the static storage keeps ``name + '.br'`` beside ``name``."""
+    return bool(HASHED_NAME.search(name)) and name.endswith(COMPRESSIBLE)
+
+
+class HashedStaticMixin(ManifestFilesMixin):
+    """``ManifestFilesMixin``, tolerant of CSS that points at missing files.
+
+    ``main.css`` came with the HTML5 UP template and references
+    ``images/header.jpeg``, which is not in the repository. Django's mixin fails
+    the whole ``collectstatic`` over that; this leaves such a reference as it was
+    and logs it instead.
+    """
+
+    def url_converter(self, name, hashed_files, template=None):
+        converter = super().url_converter(name, hashed_files, template)
+
+        def tolerant_converter(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError:
+                logger.warning("%s references %s, which is not a static file; left unhashed.",
+                               name, matchobj.group('url'))
+                return matchobj.group('matched')
+
+        return tolerant_converter
+
+
+class BundleMixin:
+    """Build the bundles in ``academic.bundles``, and their critical CSS, before
+    files are hashed.
+
+    Each bundle is added to the files ``collectstatic`` found, served from memory,
+    so it is hashed, stored and entered in the manifest like any other; only the
+    hashed copy is uploaded.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            built = InMemoryStorage()
+            paths = dict(paths)
+            for name, members in bundles.BUNDLES.items():
+                missing = [member for member in members if member not in paths]
+                if missing:
+                    yield name, None, ValueError(
+                        f"Bundle {name} lists {', '.join(missing)}, which collectstatic did not find.")
+                    return
+                content = bundles.build(name, lambda member: _read(*paths[member]))
+                built.save(name, ContentFile(content.encode()))
+                paths[name] = (built, name)
+                if name in bundles.CRITICAL:
+                    critical = bundles.critical_name(name)
+                    content = bundles.critical(content, bundles.CRITICAL[name])
+                    built.save(critical, ContentFile(content.encode()))
+                    paths[critical] = (built, critical)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+
+def _read(storage, path):
+    with storage.open(path) as f:
+        return f.read().decode('utf-8')
+
+
+class PrecompressMixin:
+    """Store a Brotli-compressed copy beside each hashed text file.
+
+    The copy is named ``<name>.br``; the storage backend derives its
+    ``Content-Encoding: br`` and ``Content-Type`` from that name. Pages link it
+    only for requests that accept Brotli (see ``{% static_compressed %}``).
+    """
+
+    # The slowest and smallest setting: it runs once per changed file, at deploy.
+    brotli_quality = 11
+
+    def _save(self, name, content):
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        data = content.read()
+        name = super()._save(name, ContentFile(data))
+        if has_brotli_copy(name):
+            super()._save(name + '.br', ContentFile(brotli.compress(data, quality=self.brotli_quality)))
+        return name
+
+    def delete(self, name):
+        super().delete(name)
+        if has_brotli_copy(name):
+            super().delete(name + '.br')
+
+
+class IncrementalUploadMixin:
+    """Skip uploading files whose content the storage already holds.
+
+    ``collectstatic`` decides what to copy by comparing modification times, and
+    on Heroku every file in the slug is as new as the build, so every deploy
+    re-uploaded everything. Here the decision is made on content instead: each
+    file saved is hashed and compared with ``sync_manifest_name``, written at
+    the end of the previous successful run. Changed files are uploaded on a
+    thread pool; ``finish_sync()`` waits for them, carries out any deletions,
+    and writes the new sync manifest.
+
+    The manifest lives in the storage itself rather than on local disk, because
+    Heroku's release phase runs on a throwaway dyno. Delete it to force a full
+    upload, e.g. after removing files from the bucket by hand.
+    """
+
+    sync_manifest_name = 'staticfiles.sync.json'
+    upload_workers = 8
+    # Bump when what gets stored for a file changes (a new compressed copy, say),
+    # so that the next run re-uploads everything rather than skipping it.
+    sync_version = '1'
+
+    def __init__(self, *args, **kwargs):
+        # Set before super().__init__(), which may already read the manifest.
+        self._previous = None
+        self._synced = {}
+        self._uploads = {}
+        self._pending_deletes = set()
+        self._executor = None
+        self.uploaded, self.skipped = set(), set()
+        super().__init__(*args, **kwargs)
+
+    def _previous_hashes(self):
+        if self._previous is None:
+            try:
+                with super()._open(self.sync_manifest_name) as f:
+                    stored = json.loads(f.read().decode())
+            except (FileNotFoundError, ValueError):
+                stored = {}
+            self._previous = stored.get('files', {}) if stored.get('version') == self.sync_version else {}
+        return self._previous
+
+    def _save(self, name, content):
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        data = content.read()
+        if isinstance(data, str):
+            data = data.encode()
+        digest = hashlib.sha256(data).hexdigest()
+        # Saving over a name cancels a deletion queued for it: the object is
+        # either overwritten below or already holds exactly this content.
+        self._pending_deletes.discard(name)
+        self._synced[name] = digest
+        if name not in self._uploads and self._previous_hashes().get(name) == digest:
+            self.skipped.add(name)
+            return name
+        if name in self._uploads:
+            # Saved twice in one run (post-processing rewrites CSS): the second
+            # upload must not overtake the first.
+            self._uploads[name].result()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.upload_workers)
+        self._uploads[name] = self._executor.submit(self._upload, name, data)
+        self.skipped.discard(name)
+        self.uploaded.add(name)
+        return name
+
+    def _upload(self, name, data):
+        return super()._save(name, ContentFile(data))
+
+    def _open(self, name, mode='rb'):
+        # Reading back a file still on its way up must wait for it to land.
+        if name in self._uploads:
+            self._uploads[name].result()
+        return super()._open(name, mode)
+
+    def exists(self, name):
+        if name in self._pending_deletes:
+            return False
+        if name in self._synced or name in self._previous_hashes():
+            return True
+        return super().exists(name)
+
+    def delete(self, name):
+        # Deferred to finish_sync(): collectstatic deletes a file before copying
+        # it over, and doing that for real would defeat the comparison in _save.
+        self._pending_deletes.add(name)
+        self._synced.pop(name, None)
+
+    def get_modified_time(self, name):
+        # Makes collectstatic copy every file, leaving the decision to _save.
+        raise NotImplementedError("Unchanged files are detected by content, not time.")
+
+    def finish_sync(self):
+        """Wait for the uploads, apply the deletions, and record what was synced.
+
+        Returns the names uploaded and skipped, as sorted lists.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        uploads, self._uploads = self._uploads, {}
+        for future in uploads.values():
+            # Re-raises the first failure before the manifest is written, so the
+            # next run uploads everything that did not land.
+            future.result()
+        previous = self._previous_hashes()
+        hashes = {**previous, **self._synced}
+        for name in sorted(self._pending_deletes):
+            super().delete(name)
+            hashes.pop(name, None)
+        if hashes != previous:
+            if super().exists(self.sync_manifest_name):
+                super().delete(self.sync_manifest_name)
+            payload = {'version': self.sync_version, 'files': hashes}
+            super()._save(self.sync_manifest_name,
+                          ContentFile(json.dumps(payload, sort_keys=True).encode()))
+        self._previous, self._synced, self._pending_deletes = hashes, {}, set()
+        report = sorted(self.uploaded), sorted(self.skipped)
+        self.uploaded, self.skipped = set(), set()
+        return report
+
+
+class ManifestS3Storage(IncrementalUploadMixin, PrecompressMixin, BundleMixin, HashedStaticMixin,
+                        S3Storage):
+    """S3 static storage with content-hashed file names.
+
+    ``collectstatic`` still uploads every file under its original name too; those
+    keep the ``CacheControl`` from ``object_parameters``, since anything that
+    links to them directly gets no cache-busting.
+    """
+
+    sync_version = '2'  # Brotli copies were added after the first sync.
+
+    # gzip-encode CSS, JavaScript and SVG as they are stored (AWS_IS_GZIPPED, for
+    # this storage only). S3File undoes it when post-processing reads them back.
+    gzip = True
+
+    @property
+    def bucket(self):
+        # S3Storage caches a single Bucket, bound to the connection of whichever
+        # thread asked first; boto3 resources are not thread-safe, so each upload
+        # thread gets its own from its own connection.
+        return self.connection.Bucket(self.bucket_name)
+
+    def get_object_parameters(self, name):
+        params = super().get_object_parameters(name)
+        if name in (self._normalize_name(self.manifest_name),
+                    self._normalize_name(self.sync_manifest_name)):
+            params['CacheControl'] = NO_CACHE
+        elif HASHED_NAME.search(name):
+            params['CacheControl'] = IMMUTABLE
+        return params
@@ -0,0 +1,63 @@
+import functools
+import hashlib
+
+from django import template
+from django.db.models import Count, Max
+from django.template.loader import get_template
+
+from academic.models import REFERENCE_LIST_FIELDS, Reference
+
+register = template.Library()
+
+TEMPLATE = '_publication_section.html'
+
+# Fragments expire after a day regardless, so that a key no edit will ever ask
+# for again does not stay in the cache for good.
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+# Bump when the markup changes outside the template, e.g. a Reference method it
+# calls; a change to the template itself changes the key by its own.
+MARKUP_VERSION = 1
+
+
+@register.inclusion_tag(TEMPLATE, takes_context=True)
+def publication_section(context, medium, heading):
+    """One medium's list of publications, cached until a reference in it changes.
+
+    The fragment is keyed on the site, the medium, its latest ``updated_at``
+    and its count, so editing or adding a reference re-renders only its own
+    section and deleting one shrinks the count. The key also carries the
+    markup's version, so a deploy that changes it starts afresh. The list
+    itself is only queried on a miss:
+
+        {% publication_section 'journal_article' 'Journal Publications' %}
+    """
+    profile = context.get('profile')
+    latest, count = _versions(context, profile).get(medium, (None, 0))
+    return {
+        'heading': heading,
+        'medium': medium,
+        'site': profile.pk if profile else '',
+        'version': f'{latest.isoformat()}:{count}' if count else '',
+        'markup': markup_version(),
+        'timeout': FRAGMENT_TIMEOUT,
+        'references': (Reference.objects.owned_by(profile).filter(medium=medium)
+                       .only(*REFERENCE_LIST_FIELDS)),
+    }
+
+
+def _versions(context, profile):
+    """(latest ``updated_at``, count) per medium, in one query per render."""
+    if 'publication_versions' not in context.render_context:
+        rows = (Reference.objects.owned_by(profile).order_by().values('medium')
+                .annotate(latest=Max('updated_at'), count=Count('pk')))
+        context.render_context['publication_versions'] = {
+            row['medium']: (row['latest'], row['count']) for row in rows}
+    return context.render_context['publication_versions']
+
+
+@functools.cache
+def markup_version():
+    """MARKUP_VERSION and a hash of the template, once per process."""
+    source = get_template(TEMPLATE).template.source
+    return f'{MARKUP_VERSION}:{hashlib.sha256(source.encode()).hexdigest()[:12]}'
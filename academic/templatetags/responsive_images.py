@@ -0,0 +1,45 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from academic.images import derivatives_field
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(fieldfile, alt="", sizes="100vw", loading="lazy", **attrs):
+    """An ``<img>`` for an image field, with a WebP and JPEG ``srcset``.
+
+    Falls back to a plain ``<img>`` of the original when the field has no
+    derivatives yet, and renders nothing when the field is empty, so templates
+    need no guard around it. Any other keyword, e.g. ``class="image fit"``,
+    becomes an attribute of the ``<img>``:
+
+        {% responsive_image profile.headshot alt="Headshot" sizes="300px" class="image fit" %}
+    """
+    if not fieldfile:
+        return ""
+    derivatives = getattr(fieldfile.instance, derivatives_field(fieldfile.field.name), None) or {}
+    extra = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+
+    jpeg = derivatives.get('jpeg')
+    if not jpeg or derivatives.get('source') != fieldfile.name:
+        return format_html('<img src="{}" alt="{}" loading="{}" decoding="async"{}>',
+                           fieldfile.url, alt, loading, extra)
+
+    storage = fieldfile.storage
+    largest = storage.url(jpeg[max(jpeg, key=int)])
+    webp = derivatives.get('webp') or {}
+    source = ""
+    if webp:
+        source = format_html('<source type="image/webp" srcset="{}" sizes="{}">',
+                             _srcset(storage, webp), sizes)
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="{}" '
+        'decoding="async"{}></picture>',
+        source, largest, _srcset(storage, jpeg), sizes, alt, loading, extra)
+
+
+def _srcset(storage, names):
+    return ", ".join("%s %sw" % (storage.url(names[width]), width)
+                     for width in sorted(names, key=int))
@@ -0,0 +1,112 @@
+import re
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from academic.bundles import BUNDLES, CRITICAL, critical_name
+from academic.storage import BundleMixin, PrecompressMixin, has_brotli_copy
+
+register = template.Library()
+
+# Critical CSS by hashed name; a hashed name never changes content, so each is
+# read from storage once per process.
+_critical_css = {}
+
+_RELATIVE_URL = re.compile(r"""url\((['"]?)(?![a-z]+:|/|#)([^'")]+)\1\)""")
+
+
+def bundled():
+    """Whether pages link bundles, rather than their members one by one."""
+    return not settings.DEBUG and isinstance(staticfiles_storage, BundleMixin)
+
+
+def accepts_brotli(request):
+    """Whether ``request``'s Accept-Encoding includes ``br`` with a non-zero q."""
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        token, _, params = coding.partition(';')
+        if token.strip() == 'br':
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def compressed_url(request, name):
+    """The URL of static file ``name``, or of its Brotli copy if ``request`` accepts it."""
+    url = static(name)
+    if (request is None or settings.DEBUG
+            or not isinstance(staticfiles_storage, PrecompressMixin)
+            or not accepts_brotli(request)):
+        return url
+    parts = urlsplit(url)
+    if not has_brotli_copy(parts.path):
+        return url
+    return urlunsplit(parts._replace(path=parts.path + '.br'))
+
+
+def bundle_urls(request, name):
+    """The URLs a page loads for bundle ``name``: the bundle, or under DEBUG its files."""
+    names = [name] if bundled() else BUNDLES[name]
+    return [compressed_url(request, member) for member in names]
+
+
+@register.simple_tag(takes_context=True)
+def static_compressed(context, name):
+    """``{% static %}``, but the Brotli copy for requests that accept it.
+
+    Only the production storage keeps Brotli copies. A page using this varies
+    with Accept-Encoding, so its view should say so (``vary_on_headers``).
+    """
+    return compressed_url(context.get('request'), name)
+
+
+@register.simple_tag(takes_context=True)
+def bundle(context, name, **attrs):
+    """Link a bundle from ``academic.bundles``, or each of its files under DEBUG.
+
+    A ``.js`` bundle renders ``<script>`` elements and a ``.css`` bundle renders
+    stylesheet ``<link>`` elements. Any keyword becomes an attribute of each:
+
+        {% bundle 'js/site.js' defer="defer" %}
+    """
+    urls = bundle_urls(context.get('request'), name)
+    extra = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+    if name.endswith('.js'):
+        element = '<script src="{}"{}></script>'
+    else:
+        element = '<link rel="stylesheet" href="{}"{} />'
+    return format_html_join('\n    ', element, ((url, extra) for url in urls))
+
+
+@register.simple_tag(takes_context=True)
+def critical_css(context, name):
+    """Inline the critical rules of CSS bundle ``name`` and load the rest without
+    blocking rendering.
+
+    The full bundle is fetched as a preload and applied once it arrives, with a
+    ``<noscript>`` fallback. Under DEBUG, or without bundles, this is the same
+    as ``{% bundle name %}``.
+    """
+    if not bundled() or name not in CRITICAL:
+        return bundle(context, name)
+    url = compressed_url(context.get('request'), name)
+    return format_html(
+        '<style>{}</style>\n'
+        '    <link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'" />\n'
+        '    <noscript><link rel="stylesheet" href="{}" /></noscript>',
+        mark_safe(_read_critical(critical_name(name))), url, url)
+
+
+def _read_critical(name):
+    stored = staticfiles_storage.stored_name(name)
+    if stored not in _critical_css:
+        with staticfiles_storage.open(stored) as f:
+            css = f.read().decode('utf-8')
+        # Relative url()s were written for the stylesheet's location, not the page's.
+        base = staticfiles_storage.url(name)
+        _critical_css[stored] = _RELATIVE_URL.sub(
+            lambda m: f'url("{urljoin(base, m.group(2))}")', css).replace('</', '<\\/')
+    return _critical_css[stored]
@@ -0,0 +1,67 @@
+"""Serving several people's sites from one deployment.
+
+Each site is a ``Profile`` with a ``domain``. ``TenantMiddleware`` sets
+``request.profile`` to the profile whose domain the request was made for, and
+views narrow every queryset to that site with ``owned_by(request.profile)``.
+Async views ``await request.aprofile()`` instead, as they would
+``request.auser()``. Requests for a host no profile claims, and rows with no
+owner, belong to the default site, the first profile created; a single-site
+database therefore needs nothing filled in.
+
+Every domain served must also be in ``ALLOWED_HOSTS``.
+"""
+
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.utils.functional import SimpleLazyObject
+
+from academic.models import Profile
+
+
+def profile_for(key):
+    """The profile a command line names by pk or domain; the default site's for None.
+
+    None as well when nothing matches.
+    """
+    if key is None:
+        return Profile.current()
+    key = str(key)
+    lookup = {'pk': int(key)} if key.isdigit() else {'domain__iexact': key}
+    return Profile.objects.filter(**lookup).first()
+
+
+def _profile(request):
+    if not hasattr(request, '_cached_profile'):
+        request._cached_profile = Profile.for_host(request.get_host())
+    return request._cached_profile
+
+
+async def _aprofile(request):
+    if not hasattr(request, '_cached_profile'):
+        request._cached_profile = await sync_to_async(Profile.for_host)(request.get_host())
+    return request._cached_profile
+
+
+def attach(request):
+    """Give ``request`` its ``profile`` and ``aprofile()``, looked up only when
+    something reads them, so a page that shows nothing from the database still
+    makes no query."""
+    request.profile = SimpleLazyObject(lambda: _profile(request))
+    request.aprofile = partial(_aprofile, request)
+
+
+class TenantMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        attach(request)
+        # Under ASGI this returns the coroutine of the async chain, for the
+        # handler to await.
+        return self.get_response(request)
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, metrics, views
 
 urlpatterns = [
     path("", views.index, name="index"),
@@ -11,4 +11,8 @@ urlpatterns = [
     path('paper/<slug:paper_slug>/', views.paper_redirect, name='paper_redirect'),
     path('talk/<slug:talk_slug>/slides/', views.slide_redirect, name='slide_redirect'),
     path('talk/<slug:talk_slug>/poster/', views.poster_redirect, name='poster_redirect'),
+    path('api/publications/', api.publications, name='api_publications'),
+    path('api/talks/', api.talks, name='api_talks'),
+    path('api/grants/', api.grants, name='api_grants'),
+    path('metrics/', metrics.metrics_view, name='metrics'),
 ]
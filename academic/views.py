@@ -1,73 +1,61 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from academic.models import Profile, Reference, Talk, Grant, Course, Service, Education, Experience,Quote,Figure
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from academic.models import REFERENCE_LIST_FIELDS, Profile, Reference, Talk, Grant, Quote
 from django.http import HttpResponse, Http404
 from django.core.management import call_command
 from django.conf import settings
+from django.views.decorators.vary import vary_on_headers
+from academic import analytics
+from academic.hints import link_hints
+from academic.routers import reads_from_replica
+from asgiref.sync import sync_to_async
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
 import logging
 import os
+import threading
 
 logger = logging.getLogger(__name__)
 
-# Cache buster for the coordination sheaf demo's JavaScript and CSS.
-#
-# In production static files are served from S3 with CacheControl max-age=86400, and
-# S3Boto3Storage does not hash filenames, so an edited asset would otherwise be shadowed by
-# yesterday's copy in every browser that has already been here. Bump this in the same commit
-# that touches static/js/sheaf-demo.js or static/css/sheaf-demo.css.
-#
-# Deliberately a constant rather than the files' mtime: on Heroku that is slug build time, so
-# it would churn on every deploy and throw the cache away for no reason.
-DEMO_ASSET_VERSION = "9"
-
-
-def _demo_context():
-    """Everything a template needs to reference the demo's static assets."""
-    return {'demo_asset_version': DEMO_ASSET_VERSION}
+# Threads for storage calls made by the async views, and the most CV builds
+# (a pdflatex each) to run at once. Beyond these, requests wait their turn
+# rather than starting more threads or processes.
+BLOCKING_THREADS = 8
+_STORAGE_POOL = ThreadPoolExecutor(max_workers=BLOCKING_THREADS, thread_name_prefix='storage')
+_CV_BUILDS = threading.BoundedSemaphore(BLOCKING_THREADS)
 
+# The CV rebuild under way for each profile pk, if any. A request for a CV that
+# is already being rebuilt waits for that build rather than starting another
+# over the same stored file.
+_cv_rebuilds = {}
+_cv_rebuilds_lock = threading.Lock()
 
 # Create your views here.
+# Pages using {% static_compressed %} link Brotli copies only for browsers that
+# accept them, so they vary with Accept-Encoding.
+@vary_on_headers('Accept-Encoding')
+@link_hints(('css/home.css', 'style'), ('js/site.js', 'script'))
+@reads_from_replica
 def index(request):
-    profile = Profile.objects.first()
-    journal_articles = Reference.objects.filter(medium='journal_article')
-    conference_proceedings = Reference.objects.filter(medium='conference_proceedings')
-    book_chapters = Reference.objects.filter(medium='book_chapter')
-    books = Reference.objects.filter(medium='book')
-    preprints = Reference.objects.filter(medium='preprint')
-    theses = Reference.objects.filter(medium='thesis')
-    other = Reference.objects.filter(medium='other')
-    talks = Talk.objects.all()
-    grants = Grant.objects.all()
-    courses = Course.objects.all()
-    service = Service.objects.all()
-    education = Education.objects.all()
-    experience = Experience.objects.all()
-    quotes = Quote.objects.all()
-    figures = Figure.objects.all()
+    profile = request.profile
+    # Publications are rendered, and cached per medium, by {% publication_section %}.
+    # Only what the project cards print; descriptions and narratives stay behind.
+    grants = (Grant.objects.owned_by(profile)
+              .only('slug', 'title', 'role', 'image', 'image_derivatives'))
+    quotes = Quote.objects.owned_by(profile)
 
     context = {
         'profile': profile,
-        'journal_articles':journal_articles,
-        'conference_proceedings':conference_proceedings,
-        'book_chapters':book_chapters,
-        'books':books,
-        'preprints':preprints,
-        'theses':theses,
-        'other':other,
-        'talks': talks,
         'grants': grants,
-        'courses': courses,
-        'service': service,
-        'education': education,
-        'experience': experience,
         'quotes':quotes,
-        'figures':figures,
     }
-    context.update(_demo_context())
 
     # The {% static %} template tag will now automatically handle S3 URLs in production
     return render(request, 'index.html', context)
 
 
+@vary_on_headers('Accept-Encoding')
+@link_hints(('css/home.css', 'style'), ('js/sheaf-demo.js', 'script'))
+@reads_from_replica
 def demo_view(request):
     """
     The coordination sheaf demo on a page of its own.
@@ -79,7 +67,7 @@ def demo_view(request):
     Entirely client-side, and deliberately touches no models: the page needs nothing from the
     database, so it costs no query and still renders if the database is unreachable.
     """
-    return render(request, 'demo.html', _demo_context())
+    return render(request, 'demo.html')
 
 
 def generate_cv_pdf(request):
@@ -88,48 +76,103 @@ def generate_cv_pdf(request):
     the file's public URL to avoid serving potentially cached content.
     """
     # Run the management command to generate the CV
-    call_command('generate_cv')
+    profile = request.profile
+    call_command('generate_cv', profile=profile.pk if profile else None)
     
     # Intentionally return no content to avoid redirecting to potentially
     # stale cached files on S3.
     return HttpResponse(status=204)
 
-def cv_redirect(request):
+@reads_from_replica
+async def cv_redirect(request):
     """
     Redirects /cv/ to the profile's current CV, giving it a stable, shareable
     URL (hansriess.com/cv) independent of the underlying storage URL.
 
     The CV is rebuilt from the database on the way through, so the download is
     always current without anyone having to remember to regenerate it. A custom
-    uploaded CV is served as-is and is never regenerated over.
+    uploaded CV is served as-is and is never regenerated over. Writes that send
+    no save signals, such as bulk imports and the admin's batch actions, need no
+    CV invalidation for the same reason.
+
+    Async, so that under ASGI a request waiting on LaTeX or storage holds no
+    worker; the blocking parts run in threads.
     """
-    profile = Profile.objects.first()
+    profile = await request.aprofile()
     if not profile:
         raise Http404("CV not found.")
 
     if not profile.use_custom_cv:
         try:
-            call_command('generate_cv')
+            await _rebuild_cv(profile.pk)
         except Exception:
             # A LaTeX or storage failure should not take the download with it;
             # fall through and serve whichever copy is already stored.
             logger.exception("CV regeneration failed; serving the stored copy")
-        profile.refresh_from_db()
+        else:
+            # The build saved its own copy of the row, which invalidated this one.
+            profile = await sync_to_async(Profile.for_host)(request.get_host())
 
     cv_file = profile.cv_file()
     if not cv_file:
         raise Http404("CV not found.")
+    # Counted in memory and written in batches; see academic/analytics.py.
+    analytics.record('cv', profile.pk)
 
     # The stored file keeps the same name every time it is rebuilt, so its URL
     # is stable and both browsers and any CDN in front of storage will happily
     # serve a stale copy. Bust that with the file's own modification time, and
     # tell the client not to cache the redirect itself.
-    response = redirect(_cache_busted_url(cv_file))
+    response = redirect(await _in_storage_pool(_cache_busted_url, cv_file))
     response['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
     response['Pragma'] = 'no-cache'
     return response
 
 
+async def _rebuild_cv(profile_pk):
+    """Rebuild the profile's CV, or wait for the rebuild of it already under way.
+
+    Every request waiting on the same build gets its outcome, error included.
+    """
+    with _cv_rebuilds_lock:
+        rebuild = _cv_rebuilds.get(profile_pk)
+        leader = rebuild is None
+        if leader:
+            rebuild = _cv_rebuilds[profile_pk] = Future()
+    if leader:
+        # Thread-sensitive, i.e. on the request's own thread and database
+        # connection; _CV_BUILDS bounds how many builds run at once.
+        await sync_to_async(_build_cv)(profile_pk, rebuild)
+    await asyncio.wrap_future(rebuild)
+
+
+def _build_cv(profile_pk, rebuild):
+    # Settles ``rebuild`` here rather than in the coroutine, so that the
+    # waiters are released even if the leading request is cancelled.
+    error = None
+    try:
+        with _CV_BUILDS:
+            call_command('generate_cv', profile=profile_pk)
+    except Exception as e:
+        error = e
+    finally:
+        with _cv_rebuilds_lock:
+            del _cv_rebuilds[profile_pk]
+        if error:
+            rebuild.set_exception(error)
+        else:
+            rebuild.set_result(None)
+
+
+def _in_storage_pool(func, *args):
+    """``func(*args)`` in the bounded storage pool, for async views to await.
+
+    Storage calls (an S3 HEAD for a modification time) touch no database, so
+    they need not run on the request's own thread.
+    """
+    return sync_to_async(func, thread_sensitive=False, executor=_STORAGE_POOL)(*args)
+
+
 def _cache_busted_url(cv_file):
     """The file's URL with a version stamp, so a rebuilt CV is not served stale."""
     url = cv_file.url
@@ -141,8 +184,11 @@ def _cache_busted_url(cv_file):
         return url
     return f"{url}{'&' if '?' in url else '?'}v={stamp}"
 
+@vary_on_headers('Accept-Encoding')
+@reads_from_replica
 def project_view(request, project_slug):
-    grant = get_object_or_404(Grant, slug=project_slug)
+    profile = request.profile
+    grant = get_object_or_404(Grant.objects.owned_by(profile), slug=project_slug)
     
     password_required = grant.password_protected and not request.session.get(f'grant_{grant.slug}_unlocked')
     error = None
@@ -155,9 +201,10 @@ def project_view(request, project_slug):
         else:
             error = 'Incorrect password'
 
-    related_publications = grant.related_publications.all()
+    related_publications = grant.related_publications.only(*REFERENCE_LIST_FIELDS)
     # Assuming talks related to the grant will have the grant's title or part of it in their title
-    related_talks = Talk.objects.filter(title__icontains=grant.title)
+    related_talks = (Talk.objects.owned_by(profile).filter(title__icontains=grant.title)
+                     .only('title', 'venue', 'date'))
     milestones = grant.milestones.all()
     
     context = {
@@ -165,35 +212,46 @@ def project_view(request, project_slug):
         'related_publications': related_publications,
         'related_talks': related_talks,
         'milestones': milestones,
-        'profile': Profile.objects.first(),
+        'profile': profile,
         'password_required': password_required,
         'error': error,
     }
     
     return render(request, 'project.html', context)
 
-def paper_redirect(request, paper_slug):
-    reference = get_object_or_404(Reference, slug=paper_slug)
-    
+@reads_from_replica
+async def paper_redirect(request, paper_slug):
+    profile = await request.aprofile()
+    reference = await aget_object_or_404(
+        Reference.objects.owned_by(profile).only('pdf_file', 'url'), slug=paper_slug)
+
     if reference.pdf_file:
+        analytics.record('paper', paper_slug)
         # This redirects the user directly to the S3 URL
-        return redirect(reference.pdf_file.url)
+        return redirect(await _in_storage_pool(lambda: reference.pdf_file.url))
     elif reference.url:
+        analytics.record('paper', paper_slug)
         # This redirects the user to the provided url link
         return redirect(reference.url)
-        
+
     raise Http404("PDF not found for this reference.")
 
-def slide_redirect(request, talk_slug):
-    talk = get_object_or_404(Talk, slug=talk_slug)
-    
+@reads_from_replica
+async def slide_redirect(request, talk_slug):
+    profile = await request.aprofile()
+    talk = await aget_object_or_404(Talk.objects.owned_by(profile).only('slides'), slug=talk_slug)
+
     if talk.slides:
-        return redirect(talk.slides.url)
+        analytics.record('slides', talk_slug)
+        return redirect(await _in_storage_pool(lambda: talk.slides.url))
     raise Http404("Slides not found for this talk.")
 
-def poster_redirect(request, talk_slug):
-    talk = get_object_or_404(Talk, slug=talk_slug)
-    
+@reads_from_replica
+async def poster_redirect(request, talk_slug):
+    profile = await request.aprofile()
+    talk = await aget_object_or_404(Talk.objects.owned_by(profile).only('poster'), slug=talk_slug)
+
     if talk.poster:
-        return redirect(talk.poster.url)
+        analytics.record('poster', talk_slug)
+        return redirect(await _in_storage_pool(lambda: talk.poster.url))
     raise Http404("Poster not found for this talk.")
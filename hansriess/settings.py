@@ -28,14 +28,21 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'django.contrib.staticfiles',
+    # Ahead of staticfiles, so that academic's collectstatic overrides its own.
     'academic',
+    'django.contrib.staticfiles',
     'storages',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # After WhiteNoise, so that static files are not counted; see academic/metrics.py.
+    'academic.metrics.MetricsMiddleware',
+    # Reports a query repeated once per row; only active under DEBUG.
+    'academic.repeated_queries.RepeatedQueryMiddleware',
+    # request.profile: which site, by host; see academic/tenants.py.
+    'academic.tenants.TenantMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -69,7 +76,8 @@ X_FRAME_OPTIONS = 'SAMEORIGIN'
 # --- Database ---
 # Heroku provides a DATABASE_URL env var. For local, we build it from other vars.
 if 'DATABASE_URL' in os.environ:
-    DATABASES = {'default': dj_database_url.config(conn_max_age=600, ssl_require=True)}
+    DATABASES = {'default': dj_database_url.config(
+        conn_max_age=600, ssl_require=not os.environ['DATABASE_URL'].startswith('sqlite'))}
 else:
     DATABASES = {
         'default': {
@@ -82,6 +90,36 @@ else:
         }
     }
 
+# A read replica (Heroku follower), for the public pages' reads; see
+# academic/routers.py. Tests use the primary in its place.
+if os.environ.get('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = dj_database_url.parse(
+        os.environ['DATABASE_REPLICA_URL'], conn_max_age=600,
+        ssl_require=not os.environ['DATABASE_REPLICA_URL'].startswith('sqlite'))
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['academic.routers.ReplicaRouter']
+
+
+# --- Cache ---
+# Profile.current() broadcasts profile edits to every worker through the cache,
+# which only works if the workers share it. Heroku Data for Redis sets REDIS_URL;
+# without it each process has its own memory cache.
+if 'REDIS_URL' in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            # Heroku's Redis presents a self-signed certificate.
+            'OPTIONS': {'ssl_cert_reqs': None} if os.environ['REDIS_URL'].startswith('rediss://') else {},
+        }
+    }
+
+
+# --- Metrics ---
+# /metrics/ is open to staff, and to a scraper sending "Authorization: Bearer
+# <METRICS_TOKEN>" when this is set.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
 
 # --- Password Validation ---
 AUTH_PASSWORD_VALIDATORS = [
@@ -112,10 +150,15 @@ if PRODUCTION:
     AWS_LOCATION = 'static'
 
     STATIC_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/{AWS_LOCATION}/'
-    STATICFILES_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
-
     MEDIA_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/media/'
-    DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'    
+
+    # Static files get content-hashed names, served immutable for a year; see
+    # academic/storage.py. Media keeps the one-day max-age above, since an
+    # upload such as cv.pdf is overwritten in place.
+    STORAGES = {
+        'default': {'BACKEND': 'storages.backends.s3boto3.S3Boto3Storage'},
+        'staticfiles': {'BACKEND': 'academic.storage.ManifestS3Storage'},
+    }
     STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
     
     if not RUNNING_LOCALLY:
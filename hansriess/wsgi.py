@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hansriess.settings")
 
 application = get_wsgi_application()
+
+# Write download counts from this process in the background.
+from academic import analytics  # noqa: E402
+
+analytics.start()